@@ -1,58 +1,288 @@
-from pydantic_settings import BaseSettings
-from typing import Optional
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Mapping, Optional, cast
 import os
+import re
 
+if TYPE_CHECKING:
+    from app.settings_model import Settings
 
-class Settings(BaseSettings):
-    # API Keys
-    openai_api_key: Optional[str] = None
-    openai_base_url: Optional[str] = None
-    anthropic_api_key: Optional[str] = None
+# Path of the dotenv file; overridable so deployments can point at a mounted file
+ENV_FILE = os.environ.get("NL2SQL_ENV_FILE", ".env")
 
-    # LangSmith Configuration
-    langchain_tracing_v2: bool = False
-    langchain_api_key: Optional[str] = None
-    langchain_project: str = "sql-agent-project"
+# Settings are read from `NL2SQL_<FIELD>` first, then the legacy `<FIELD>`
+# name; both upper case, matched exactly.
+ENV_PREFIX = "NL2SQL_"
 
-    # Database Configuration
-    database_url: str = "sqlite:///./data/sql_agent.db"
-    metadata_database_url: str = "sqlite:///./data/metadata.db"
+DEFAULT_DATABASE_URL = "sqlite:///./data/sql_agent.db"
 
+# Field defaults, shared by the pydantic model and the NL2SQL_CONFIG_FAST path.
+# Unset keys/URLs are "" rather than None so callers only test truthiness.
+DEFAULTS: Dict[str, Any] = {
+    # API Keys
+    "openai_api_key": "",
+    "openai_base_url": "",
+    "anthropic_api_key": "",
+    # LangSmith Configuration
+    "langchain_tracing_v2": False,
+    "langchain_api_key": "",
+    "langchain_project": "sql-agent-project",
+    # Database Configuration
+    "database_url": DEFAULT_DATABASE_URL,
+    "metadata_database_url": "sqlite:///./data/metadata.db",
     # FastAPI Configuration
-    host: str = "0.0.0.0"
-    port: int = 8000
-    debug: bool = True
-
+    "host": "0.0.0.0",
+    "port": 8000,
+    "debug": True,
     # File Upload Configuration
-    max_file_size: str = "100MB"
-    upload_dir: str = "./data/uploads"
-
+    "max_file_size": "100MB",
+    "upload_dir": "./data/uploads",
     # Visualization Configuration
-    vis_output_dir: str = "./data/visualizations"
-
+    "vis_output_dir": "./data/visualizations",
     # Model Configuration
-    performance_model: str = "gpt-4o-mini"
-    reasoning_model: str = "gpt-4o"
-    performance_temperature: float = 0.0
-    reasoning_temperature: float = 0.2
-
+    "performance_model": "gpt-4o-mini",
+    "reasoning_model": "gpt-4o",
+    "performance_temperature": 0.0,
+    "reasoning_temperature": 0.2,
+    # When uploads ask the LLM for a naming plan: "always", "lazy" (only when a
+    # column or the file name is not already a plain identifier) or "never"
+    "naming_llm_strategy": "always",
     # MLflow Debug Configuration
-    mlflow_enabled: bool = False
-    mlflow_tracking_uri: str = "file:./data/mlruns"
-    mlflow_experiment_name: str = "nl2sql-llm-debug"
-    mlflow_run_name_prefix: str = "sql-agent"
+    "mlflow_enabled": False,
+    "mlflow_tracking_uri": "file:./data/mlruns",
+    "mlflow_experiment_name": "nl2sql-llm-debug",
+    "mlflow_run_name_prefix": "sql-agent",
+}
+
+# Bytes allowed in a `.env` key; bytes.translate() deletes them, so any
+# leftover means the key is invalid.
+_ENV_KEY_BYTES = bytes(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_."
+)
+
+
+def scan_env_file(path: str) -> Dict[str, str]:
+    """Parse a `.env` file with plain bytes scanning (no regex, no python-dotenv).
+
+    Supports `KEY=value`, `export KEY=value`, full-line and inline `#` comments
+    and single/double quoted values. Keys are returned as written.
+    """
+    try:
+        with open(path, "rb") as f:
+            buf = f.read()
+    except OSError:
+        return {}
+    # Normalise CRLF / bare-CR line endings (as python-dotenv does) in one pass;
+    # the membership test keeps LF-only files from being copied at all.
+    if b"\r" in buf:
+        buf = buf.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    values: Dict[str, str] = {}
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        newline = buf.find(b"\n", pos)
+        if newline < 0:
+            newline = end
+        line = buf[pos:newline].strip()
+        pos = newline + 1
+
+        if not line or line[0] == 0x23:  # blank or "#"
+            continue
+        if line.startswith(b"export "):
+            line = line[7:].lstrip()
+        eq = line.find(b"=")
+        if eq <= 0:
+            continue
+        key = line[:eq].rstrip()
+        if not key or key.translate(None, _ENV_KEY_BYTES):
+            continue
+
+        value = line[eq + 1 :].lstrip()
+        quote = value[:1]
+        if quote in (b'"', b"'") and value.find(quote, 1) > 0:
+            value = value[1 : value.find(quote, 1)]
+        else:
+            hash_pos = value.find(b"#")
+            # Only " #" starts an inline comment; "a#b" stays a literal value.
+            while hash_pos > 0 and value[hash_pos - 1] not in b" \t":
+                hash_pos = value.find(b"#", hash_pos + 1)
+            if hash_pos >= 0:
+                value = value[:hash_pos]
+            value = value.rstrip()
+        values[key.decode("ascii")] = value.decode("utf-8", errors="replace")
+    return values
+
+
+_FILE_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?B)?\s*$", re.IGNORECASE)
+_FILE_SIZE_UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+
+
+def parse_file_size(value: str) -> int:
+    """Convert a size string such as `100MB` or `1.5 GB` into bytes."""
+    match = _FILE_SIZE_RE.match(value)
+    if not match:
+        raise ValueError(f"Invalid max_file_size: {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * _FILE_SIZE_UNITS[(unit or "B").upper()])
+
+
+# Spellings pydantic accepts for bool fields
+_BOOL_STRINGS = {
+    "1": True, "on": True, "t": True, "true": True, "y": True, "yes": True,
+    "0": False, "off": False, "f": False, "false": False, "n": False, "no": False,
+}
+
+
+def _parse_bool(value: str) -> Any:
+    # Unknown spellings are returned as-is so validation still rejects them
+    return _BOOL_STRINGS.get(value.strip().lower(), value)
+
+
+# Non-string Settings fields and how to convert their raw env/.env strings
+_COERCE: Dict[str, Callable[[str], Any]] = {
+    "langchain_tracing_v2": _parse_bool,
+    "port": int,
+    "debug": _parse_bool,
+    "performance_temperature": float,
+    "reasoning_temperature": float,
+    "mlflow_enabled": _parse_bool,
+}
+
+
+def coerce_env_values(raw: Dict[str, str]) -> Dict[str, Any]:
+    """Convert raw env strings to their field types with one table lookup each."""
+    values: Dict[str, Any] = {}
+    for key, value in raw.items():
+        convert = _COERCE.get(key)
+        if convert is not None:
+            try:
+                value = convert(value)
+            except ValueError:
+                pass  # leave it to pydantic to report
+        values[key] = value
+    return values
+
+
+def lookup_env(source: Mapping[str, str], field_name: str) -> Optional[str]:
+    """Value for `field_name` in `source`: `NL2SQL_<FIELD>`, else `<FIELD>`."""
+    name = field_name.upper()
+    value = source.get(ENV_PREFIX + name)
+    return source.get(name) if value is None else value
+
+
+def collect_env_values(
+    source: Mapping[str, str], field_names: Iterable[str]
+) -> Dict[str, str]:
+    """Raw string values of every field found in `source`, keyed by field name."""
+    values: Dict[str, str] = {}
+    for field_name in field_names:
+        value = lookup_env(source, field_name)
+        if value is not None:
+            values[field_name] = value
+    return values
+
+
+def sqlite_path(url: str) -> Optional[str]:
+    """Return the filesystem path behind a `sqlite:///` URL, or None."""
+    if not url.startswith("sqlite:///"):
+        return None
+    path = url.removeprefix("sqlite:///")
+    return path if path and path != ":memory:" else None
+
+
+def _warm_page_cache(path: Optional[str]) -> None:
+    """Ask the kernel to prefetch `path` so the first queries skip cold reads."""
+    if not path or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _fast_settings() -> SimpleNamespace:
+    """Settings as a plain namespace (defaults < `.env` < env), no pydantic.
+
+    Values are coerced but not validated, and LangSmith env vars are not set;
+    meant for test collection and CLI tools, not for serving.
+    """
+    raw = collect_env_values(scan_env_file(ENV_FILE), DEFAULTS)
+    raw.update(collect_env_values(os.environ, DEFAULTS))
+    values = {**DEFAULTS, **coerce_env_values(raw)}
+    return SimpleNamespace(
+        **values,
+        max_file_size_bytes=parse_file_size(values["max_file_size"]),
+        database_path=sqlite_path(values["database_url"]),
+        metadata_attach_path=sqlite_path(values["metadata_database_url"]),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> "Settings":
+    """Build the settings once per process; `.env` is only parsed on first use."""
+    if os.environ.get("NL2SQL_CONFIG_FAST") == "1":
+        settings = cast("Settings", _fast_settings())
+    else:
+        # pydantic-settings is imported here, not at module import, so tooling
+        # that only needs a value or two (see get_database_url) never loads it.
+        from app.settings_model import Settings
+
+        # NL2SQL_SETTINGS_PIPELINE=1 (debugging aid) goes through the stock
+        # pydantic-settings source pipeline instead of `from_environ()`.
+        if os.environ.get("NL2SQL_SETTINGS_PIPELINE") == "1":
+            settings = Settings()
+        else:
+            settings = Settings.from_environ()
+
+    # Create the data directories once here rather than in request handlers
+    database_paths = (settings.database_path, settings.metadata_attach_path)
+    for directory in (
+        settings.upload_dir,
+        settings.vis_output_dir,
+        *(os.path.dirname(path) for path in database_paths if path),
+    ):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # Warm the SQLite files once per worker instead of paying disk latency on
+    # the first request.
+    for path in database_paths:
+        _warm_page_cache(path)
+
+    return settings
+
+
+def is_debug() -> bool:
+    """`settings.debug`, read from the cached settings when first needed."""
+    return bool(get_settings().debug)
+
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
-        extra = "ignore"
+def get_database_url() -> str:
+    """Resolve the database URL (env > .env > default) without building Settings."""
+    if get_settings.cache_info().currsize:
+        return get_settings().database_url
+    value = lookup_env(os.environ, "database_url")
+    if value is None:
+        value = lookup_env(scan_env_file(ENV_FILE), "database_url")
+    return value or DEFAULT_DATABASE_URL
 
 
-# Initialize settings
-settings = Settings()
+def __getattr__(name: str) -> Any:
+    # Deprecated shims: `from app.config import settings` / `Settings` / `DEBUG`
+    # keep working but now resolve lazily.
+    if name == "settings":
+        return get_settings()
+    if name == "DEBUG":
+        return is_debug()
+    if name == "Settings":
+        from app.settings_model import Settings
 
-# Configure LangSmith if enabled
-if settings.langchain_tracing_v2 and settings.langchain_api_key:
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_API_KEY"] = settings.langchain_api_key
-    os.environ["LANGCHAIN_PROJECT"] = settings.langchain_project
+        return Settings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
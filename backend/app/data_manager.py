@@ -1,22 +1,178 @@
 #!/usr/bin/env python3
 
+import hashlib
+import importlib.util
 import json
 import logging
 import os
 import re
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import cached_property, lru_cache
 from io import BytesIO
-from typing import Any, Dict, List, NotRequired, Optional, Set, TypedDict, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NotRequired,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+    cast,
+)
 
 import numpy as np
 import pandas as pd
-from langchain.chat_models import init_chat_model
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Connection, Engine, Inspector
+from sqlalchemy.sql.elements import TextClause
+from utils.file_processor import convert_numpy_to_native, read_excel_bytes
 
-from app.config import settings
+from app.config import get_settings, is_debug
 
 logger = logging.getLogger(__name__)
 
+# pyarrow 为可选依赖：安装后读取 SQL 结果使用 Arrow 类型，整数列含 NULL 时不再被提升为 float64
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+_SQL_READ_KWARGS: Dict[str, Any] = {"dtype_backend": "pyarrow"} if _HAS_PYARROW else {}
+
+# 上传文件写库时每批写入的行数
+UPLOAD_WRITE_CHUNK_SIZE = 10_000
+
+
+def _is_temporal_dtype(dtype: Any) -> bool:
+    """日期/时间/时长类型（含 Arrow 的 date32、time64 等）"""
+    return dtype.kind in "mM" or str(dtype).startswith("time")
+
+
+def _executemany_insert(
+    pd_table: Any, conn: Any, keys: List[str], data_iter: Iterable[Any]
+) -> None:
+    """to_sql 的 method：每批行直接交给 DBAPI cursor.executemany
+
+    跳过 SQLAlchemy 对每批参数的编译与逐行类型处理，仍在 to_sql 的同一事务内执行。
+    """
+    preparer = conn.dialect.identifier_preparer
+    columns = ", ".join(preparer.quote(key) for key in keys)
+    placeholders = ", ".join("?" * len(keys))
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(
+            f"INSERT INTO {preparer.quote(pd_table.name)} ({columns}) "
+            f"VALUES ({placeholders})",
+            data_iter,
+        )
+    finally:
+        cursor.close()
+
+
+_NON_IDENT_RE = re.compile(r"[^a-zA-Z0-9_]+")
+_PLAIN_IDENT_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+_LEADING_DIGIT_RE = re.compile(r"^[0-9]")
+
+
+@lru_cache(maxsize=4096)
+def _sanitize_identifier(value: str, fallback: str, prefix: str) -> str:
+    """清洗为合法 SQL 标识符；纯函数，上传时每列都会调用，按参数缓存结果。"""
+    normalized = _NON_IDENT_RE.sub("_", value).strip("_").lower()
+    if not normalized:
+        normalized = fallback
+    if _LEADING_DIGIT_RE.match(normalized):
+        normalized = f"{prefix}_{normalized}"
+    return normalized
+
+
+_BOOL_STRINGS = frozenset({"true", "false", "0", "1"})
+_NAN_STRINGS = frozenset({"nan", "+nan", "-nan"})
+
+
+def _to_json_scalar(value: Any) -> Any:
+    """把驱动返回的非 JSON 原生标量（Decimal、日期时间、二进制）转成可序列化的值"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return value
+
+
+_JSON_NATIVE_TYPES = (str, int, float, bool, type(None))
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parses_as_float(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+# 元信息库读写语句，{m} 为表名前缀（ATTACH 时为 "meta."）
+_META_SQL_TEMPLATES: Dict[str, str] = {
+    "upsert_table": """
+        INSERT INTO {m}table_metadata(table_name, table_comment_cn, updated_at)
+        VALUES(:table_name, :table_comment_cn, CURRENT_TIMESTAMP)
+        ON CONFLICT(table_name) DO UPDATE SET
+            table_comment_cn = excluded.table_comment_cn,
+            updated_at = CURRENT_TIMESTAMP
+    """,
+    "insert_columns": """
+        INSERT INTO {m}column_metadata(table_name, column_name, column_comment_cn, original_name)
+        VALUES(:table_name, :column_name, :column_comment_cn, :original_name)
+    """,
+    "insert_questions": """
+        INSERT INTO {m}sample_questions(table_name, question_order, question_text)
+        VALUES(:table_name, :question_order, :question_text)
+    """,
+    "delete_table": "DELETE FROM {m}table_metadata WHERE table_name = :table_name",
+    "delete_columns": "DELETE FROM {m}column_metadata WHERE table_name = :table_name",
+    "delete_questions": "DELETE FROM {m}sample_questions WHERE table_name = :table_name",
+    "select_table": """
+        SELECT table_comment_cn FROM {m}table_metadata WHERE table_name = :table_name
+    """,
+    "select_columns": """
+        SELECT column_name, column_comment_cn, COALESCE(original_name, column_name) AS original_name
+        FROM {m}column_metadata
+        WHERE table_name = :table_name
+    """,
+    "select_questions": """
+        SELECT question_text
+        FROM {m}sample_questions
+        WHERE table_name = :table_name
+        ORDER BY question_order ASC
+    """,
+    "select_all_tables": "SELECT table_name, table_comment_cn FROM {m}table_metadata",
+    "select_naming_plan": """
+        SELECT plan_json FROM {m}naming_plans WHERE cache_key = :cache_key
+    """,
+    "upsert_naming_plan": """
+        INSERT INTO {m}naming_plans(cache_key, plan_json, created_at)
+        VALUES(:cache_key, :plan_json, CURRENT_TIMESTAMP)
+        ON CONFLICT(cache_key) DO UPDATE SET
+            plan_json = excluded.plan_json,
+            created_at = CURRENT_TIMESTAMP
+    """,
+    "select_all_columns": """
+        SELECT table_name, column_name, column_comment_cn,
+               COALESCE(original_name, column_name) AS original_name
+        FROM {m}column_metadata
+    """,
+    "select_all_questions": """
+        SELECT table_name, question_text
+        FROM {m}sample_questions
+        ORDER BY table_name, question_order ASC
+    """,
+}
+
 
 class TableMetadataDict(TypedDict):
     name: str
@@ -43,34 +199,131 @@ class NamingPlan(TypedDict):
     sample_questions: NotRequired[List[str]]
 
 
+# 命名方案缓存键：(文件名去扩展名, 排序后的原始列名)
+NamingPlanKey = Tuple[str, Tuple[str, ...]]
+
+
 class DataManager:
     """数据管理器类"""
 
-    def __init__(self):
+    # 命名方案 LRU 缓存的最大条目数
+    NAMING_PLAN_CACHE_SIZE = 128
+    # 列类型推断最多检查的值个数
+    TYPE_INFERENCE_SAMPLE_SIZE = 1000
+
+    def __init__(self, eager: bool = True):
+        """
+        Args:
+            eager: 为 True 时在构造时立即初始化 LLM、元信息库并扫描数据库（旧行为）；
+                为 False 时这些工作推迟到首次使用
+        """
         self.data_cache: Dict[str, pd.DataFrame] = {}
-        self.metadata: Dict[str, TableMetadataDict] = {}
-        self.db_url = settings.database_url
-        self.meta_db_url = settings.metadata_database_url
+        self._metadata: Dict[str, TableMetadataDict] = {}
+        self._scanned = False
+        # 单例会被多个工作线程共享：懒初始化（LLM、元信息库、首次扫描）都在此锁内完成；
+        # 可重入，因为扫描过程中会首次访问 meta_engine
+        self._init_lock = threading.RLock()
+        # 配置只解析一次，后续统一从 self.settings 读取
+        self.settings = get_settings()
+        self.db_url = self.settings.database_url
+        self.meta_db_url = self.settings.metadata_database_url
         self.engine: Optional[Engine] = None
-        self.meta_engine: Optional[Engine] = None
-        self.llm = self._initialize_llm()
+        # 复用的 Inspector，自带反射结果缓存；表结构变化时置空重建
+        self._inspector: Optional[Inspector] = None
+        # 元信息表名前缀；元信息库 ATTACH 到业务连接上时为 "meta."
+        self.meta_prefix = ""
+        # (文件名, 排序后的列名) -> LLM 命名方案，重复上传同一结构时不再调用 LLM
+        self._naming_plan_cache: "OrderedDict[NamingPlanKey, NamingPlan]" = (
+            OrderedDict()
+        )
+        # 上传在多个工作线程中并发执行，命名方案缓存的读取与写入/淘汰都在此锁内
+        self._naming_plan_lock = threading.Lock()
+        # get_table_list 的结果；metadata 增删改时置空重建
+        self._table_list_cache: Optional[List[Dict[str, Any]]] = None
+
+        # 创建引擎不会建立连接，始终立即执行
+        self._initialize_engine()
+        if eager:
+            _ = self.llm
+            # 扫描会先访问 meta_engine，从而完成元信息库初始化
+            self._ensure_scanned()
+
+    def _init_once(self, name: str, factory: Callable[[], Any]) -> Any:
+        """在 _init_lock 内只执行一次 factory，结果存入实例字典供 cached_property 复用"""
+        with self._init_lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = factory()
+            return self.__dict__[name]
+
+    @cached_property
+    def llm(self):
+        """命名用 LLM，首次使用时才创建客户端"""
+        return self._init_once("llm", self._initialize_llm)
+
+    @cached_property
+    def meta_engine(self) -> Optional[Engine]:
+        """元信息库引擎，首次使用时建表；初始化失败时为 None"""
+        return self._init_once("meta_engine", self._initialize_metadata_store)
+
+    @cached_property
+    def _meta_sql(self) -> Dict[str, TextClause]:
+        """按元信息表前缀预先构造好的读写语句，避免每次调用都重新解析 SQL 文本"""
+        return {
+            key: text(sql.format(m=self.meta_prefix))
+            for key, sql in _META_SQL_TEMPLATES.items()
+        }
 
-        # 初始化元信息数据库
-        self._initialize_metadata_store()
-        # 初始化时扫描数据库所有表
-        self._scan_database_tables()
+    @property
+    def metadata(self) -> Dict[str, TableMetadataDict]:
+        """所有数据表的 metadata，首次访问时扫描数据库"""
+        self._ensure_scanned()
+        return self._metadata
 
-    def _initialize_metadata_store(self) -> None:
-        """初始化元信息数据库（与业务数据隔离）。"""
+    def _ensure_scanned(self) -> None:
+        # 双重检查：扫描完成后才置位，其他线程在扫描期间等锁而不是读到半成品
+        if self._scanned:
+            return
+        with self._init_lock:
+            if not self._scanned:
+                self._scan_database_tables()
+                self._scanned = True
+
+    def _initialize_engine(self) -> None:
+        """创建业务库引擎；元信息库为 SQLite 文件时挂载到同一引擎上。"""
+        self.engine = create_engine(self.db_url)
+        attach_path = self.settings.metadata_attach_path
+        if attach_path and self.db_url.startswith("sqlite"):
+            event.listen(self.engine, "connect", self._attach_metadata_db)
+            self.meta_prefix = "meta."
+
+    def _get_inspector(self, engine: Engine) -> Inspector:
+        """返回复用的 Inspector；get_columns 等反射结果由其 info_cache 缓存。"""
+        if self._inspector is None:
+            self._inspector = inspect(engine)
+        return self._inspector
+
+    def _invalidate_schema_cache(self) -> None:
+        """建表/删表后调用，丢弃缓存的反射结果。"""
+        self._inspector = None
+
+    def _initialize_metadata_store(self) -> Optional[Engine]:
+        """初始化元信息数据库（与业务数据隔离）。
+
+        元信息库为 SQLite 文件时，通过 `ATTACH DATABASE ... AS meta` 挂到业务引擎
+        的每个连接上，两者共用一个连接池；否则退回独立引擎。
+        """
         try:
-            self.meta_engine = create_engine(self.meta_db_url)
-            if self.meta_engine is None:
-                return
-            with self.meta_engine.begin() as conn:
+            meta_engine = (
+                self.engine if self.meta_prefix else create_engine(self.meta_db_url)
+            )
+            if meta_engine is None:
+                return None
+            m = self.meta_prefix
+            with meta_engine.begin() as conn:
                 conn.execute(
                     text(
-                        """
-                        CREATE TABLE IF NOT EXISTS table_metadata (
+                        f"""
+                        CREATE TABLE IF NOT EXISTS {m}table_metadata (
                             table_name TEXT PRIMARY KEY,
                             table_comment_cn TEXT NOT NULL,
                             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
@@ -80,8 +333,8 @@ class DataManager:
                 )
                 conn.execute(
                     text(
-                        """
-                        CREATE TABLE IF NOT EXISTS column_metadata (
+                        f"""
+                        CREATE TABLE IF NOT EXISTS {m}column_metadata (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             table_name TEXT NOT NULL,
                             column_name TEXT NOT NULL,
@@ -94,8 +347,8 @@ class DataManager:
                 )
                 conn.execute(
                     text(
-                        """
-                        CREATE TABLE IF NOT EXISTS sample_questions (
+                        f"""
+                        CREATE TABLE IF NOT EXISTS {m}sample_questions (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             table_name TEXT NOT NULL,
                             question_order INTEGER NOT NULL,
@@ -105,17 +358,47 @@ class DataManager:
                         """
                     )
                 )
+                conn.execute(
+                    text(
+                        f"""
+                        CREATE TABLE IF NOT EXISTS {m}naming_plans (
+                            cache_key TEXT PRIMARY KEY,
+                            plan_json TEXT NOT NULL,
+                            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                        )
+                        """
+                    )
+                )
         except Exception as e:
             logger.warning(f"Metadata DB init failed: {e}")
-            self.meta_engine = None
+            return None
+        return meta_engine
+
+    def _attach_metadata_db(self, dbapi_connection: Any, _record: Any) -> None:
+        """每个新建的 SQLite 连接上挂载元信息库。
+
+        上传时业务表与其元信息在同一事务中提交，SQLite 只有在各库都使用回滚日志时
+        才保证跨库提交的原子性；因此元信息库保持默认的回滚日志（不使用 WAL）。
+        """
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(
+                "ATTACH DATABASE ? AS meta", (self.settings.metadata_attach_path,)
+            )
+        finally:
+            cursor.close()
 
     def _initialize_llm(self):
         """初始化用于命名的 LLM，缺省时自动降级为本地规则命名"""
+        settings = self.settings
         api_key = settings.openai_api_key or os.getenv("OPENAI_API_KEY")
         if not api_key:
             return None
 
         try:
+            # langchain 导入较重（约 0.7s），只在确实需要 LLM 时才导入
+            from langchain.chat_models import init_chat_model
+
             kwargs: Dict[str, Any] = {
                 "temperature": settings.performance_temperature,
                 "api_key": api_key,
@@ -136,28 +419,36 @@ class DataManager:
         """扫描数据库中的所有表并初始化 metadata"""
 
         try:
-            self.engine = create_engine(self.db_url)
+            if self.engine is None:
+                self.engine = create_engine(self.db_url)
             engine = self.engine
             if engine is None:
                 return
 
             # 使用 Inspector 获取表信息
-            inspector = inspect(engine)
+            inspector = self._get_inspector(engine)
             table_names = inspector.get_table_names()
+            # 元信息一次批量读入，循环内不再逐表查询
+            bulk_records = self._load_all_metadata_records()
 
-            # 为每个表创建 metadata
+            # 为每个表创建 metadata；先在局部字典里建好，最后一次性替换
+            metadata: Dict[str, TableMetadataDict] = {}
             with engine.connect() as conn:
+                row_counts = self._count_table_rows(conn, table_names)
+                column_names = self._fetch_column_names(conn, inspector, table_names)
                 for table_name in table_names:
                     # 获取列信息
-                    columns_info = inspector.get_columns(table_name)
-                    columns = [str(col["name"]) for col in columns_info]
+                    columns = column_names[table_name]
 
                     # 获取行数
-                    result = conn.execute(text(f'SELECT COUNT(*) FROM "{table_name}"'))
-                    row_count_raw = result.scalar()
-                    row_count = int(row_count_raw or 0)
+                    row_count = row_counts.get(table_name, 0)
 
-                    meta_record = self._get_table_metadata_record(table_name)
+                    # 批量读取失败时才逐表查询
+                    meta_record = (
+                        bulk_records.get(table_name)
+                        if bulk_records is not None
+                        else self._get_table_metadata_record(table_name)
+                    )
                     table_comment_cn = (
                         str(meta_record["table_comment_cn"])
                         if meta_record and meta_record.get("table_comment_cn")
@@ -167,13 +458,13 @@ class DataManager:
                         cast(Dict[str, str], meta_record.get("column_comments"))
                         if meta_record
                         and isinstance(meta_record.get("column_comments"), dict)
-                        else {col: col for col in columns}
+                        else dict(zip(columns, columns))
                     )
                     column_original_names = (
                         cast(Dict[str, str], meta_record.get("column_original_names"))
                         if meta_record
                         and isinstance(meta_record.get("column_original_names"), dict)
-                        else {col: col for col in columns}
+                        else dict(zip(columns, columns))
                     )
                     sample_questions = (
                         cast(List[str], meta_record.get("sample_questions"))
@@ -182,7 +473,7 @@ class DataManager:
                         else []
                     )
 
-                    self.metadata[table_name] = {
+                    metadata[table_name] = {
                         "name": table_comment_cn,
                         "description": f"{table_name} 数据表",
                         "columns": columns,
@@ -194,23 +485,103 @@ class DataManager:
                         "sample_questions": sample_questions,
                     }
 
-            print(f"✅ 成功扫描数据库，发现 {len(self.metadata)} 个表")
+            self._metadata = metadata
+            self._table_list_cache = None
+            print(f"✅ 成功扫描数据库，发现 {len(metadata)} 个表")
 
         except Exception as e:
             print(f"❌ 扫描数据库时出错: {e}")
-            import traceback
-
-            traceback.print_exc()
+            if is_debug():
+                import traceback
+
+                traceback.print_exc()
+
+    # SQLite 默认最多 500 个 UNION 子句，留出余量
+    ROW_COUNT_BATCH_SIZE = 400
+
+    def _count_table_rows(self, conn: Any, table_names: List[str]) -> Dict[str, int]:
+        """用 UNION ALL 批量统计各表行数，失败时退回逐表 COUNT(*)。"""
+        quote = conn.dialect.identifier_preparer.quote
+        row_counts: Dict[str, int] = {}
+        for start in range(0, len(table_names), self.ROW_COUNT_BATCH_SIZE):
+            batch = table_names[start : start + self.ROW_COUNT_BATCH_SIZE]
+            params = {f"t{idx}": name for idx, name in enumerate(batch)}
+            sql = " UNION ALL ".join(
+                f"SELECT :t{idx} AS table_name, COUNT(*) AS row_count FROM {quote(name)}"
+                for idx, name in enumerate(batch)
+            )
+            try:
+                for table_name, row_count in conn.execute(text(sql), params):
+                    row_counts[str(table_name)] = int(row_count or 0)
+            except Exception as e:
+                logger.warning("Batched row count failed, counting per table: %s", e)
+                conn.rollback()
+                for name in batch:
+                    result = conn.execute(text(f"SELECT COUNT(*) FROM {quote(name)}"))
+                    row_counts[name] = int(result.scalar() or 0)
+        return row_counts
+
+    def _fetch_column_names(
+        self, conn: Any, inspector: Inspector, table_names: List[str]
+    ) -> Dict[str, List[str]]:
+        """批量读取各表列名；SQLite 上一条 pragma_table_xinfo 联表查询取全部表。
+
+        与 Inspector.get_columns 一致：按列序返回，跳过虚表的隐藏列（hidden = 1），
+        保留生成列。其他方言或查询失败时退回逐表 get_columns。
+        """
+        if conn.dialect.name == "sqlite":
+            try:
+                rows = conn.execute(
+                    text(
+                        """
+                        SELECT m.name, p.name
+                        FROM sqlite_master AS m
+                        JOIN pragma_table_xinfo(m.name) AS p
+                        WHERE m.type = 'table' AND p.hidden != 1
+                        ORDER BY m.name, p.cid
+                        """
+                    )
+                )
+                columns: Dict[str, List[str]] = defaultdict(list)
+                for table_name, column_name in rows:
+                    columns[table_name].append(column_name)
+                return {name: columns.get(name, []) for name in table_names}
+            except Exception as e:
+                logger.warning("Batched column lookup failed, using inspector: %s", e)
+                conn.rollback()
+        # Inspector 返回的列名已是 str，无需逐个再转换
+        return {
+            name: [col["name"] for col in inspector.get_columns(name)]
+            for name in table_names
+        }
 
     def get_engine(self) -> Optional[Engine]:
         """获取 SQLAlchemy 引擎"""
         return self.engine
 
-    def read_table(self, table_name: str) -> Optional[pd.DataFrame]:
+    @cached_property
+    def agent_engine(self) -> Optional[Engine]:
+        """供 SQL Agent 执行模型生成 SQL 的引擎
+
+        业务引擎的每个连接都挂载了元信息库（meta.*）；Agent 使用不带挂载的独立连接池，
+        生成的 SQL 读写不到元信息表。元信息库未挂载时直接复用业务引擎。
+        """
+        return self._init_once("agent_engine", self._create_agent_engine)
+
+    def _create_agent_engine(self) -> Optional[Engine]:
+        if self.engine is None or not self.meta_prefix:
+            return self.engine
+        return create_engine(self.db_url)
+
+    def read_table(
+        self, table_name: str, convert_native: bool = True
+    ) -> Optional[pd.DataFrame]:
         """使用 SQLAlchemy 读取表数据为 DataFrame
 
         Args:
             table_name: 表名
+            convert_native: 是否转换为 Python 原生对象；只在 pandas 内计算时传 False，
+                跳过逐列 object 转换并保留原始类型
 
         Returns:
             DataFrame 对象，如果表不存在或出错则返回 None
@@ -220,18 +591,24 @@ class DataManager:
             return None
 
         try:
-            df = pd.read_sql_table(table_name, self.engine)
+            df = pd.read_sql_table(table_name, self.engine, **_SQL_READ_KWARGS)
+            if not convert_native:
+                return df
             # 转换 NumPy 类型为 Python 原生类型，避免 Pydantic 序列化错误
             return self._convert_numpy_to_native(df)
         except Exception as e:
             print(f"❌ 读取表 {table_name} 时出错: {e}")
             return None
 
-    def execute_query(self, query: str) -> Optional[pd.DataFrame]:
+    def execute_query(
+        self, query: str, convert_native: bool = True
+    ) -> Optional[pd.DataFrame]:
         """执行 SQL 查询并返回结果为 DataFrame
 
         Args:
             query: SQL 查询语句
+            convert_native: 是否转换为 Python 原生对象，含义同 read_table；
+                只需要 JSON 记录时应使用 execute_query_records
 
         Returns:
             DataFrame 对象，如果查询出错则返回 None
@@ -241,13 +618,49 @@ class DataManager:
             return None
 
         try:
-            df = pd.read_sql_query(query, self.engine)
+            df = pd.read_sql_query(query, self.engine, **_SQL_READ_KWARGS)
+            if not convert_native:
+                return df
             # 转换 NumPy 类型为 Python 原生类型，避免 Pydantic 序列化错误
             return self._convert_numpy_to_native(df)
         except Exception as e:
             print(f"❌ 执行查询时出错: {e}")
             return None
 
+    def execute_query_records(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """执行 SQL 查询并直接返回记录列表，不经过 DataFrame
+
+        供只需要 JSON 结果的接口使用；驱动返回的值本身就是 Python 标量，
+        只需处理少数非 JSON 原生类型。
+
+        Args:
+            query: SQL 查询语句
+
+        Returns:
+            记录列表，如果查询出错则返回 None
+        """
+        if self.engine is None:
+            print(f"❌ 数据库引擎未初始化")
+            return None
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(text(query))
+                keys = list(result.keys())
+                rows = result.all()
+            return [
+                {
+                    key: value
+                    if type(value) in _JSON_NATIVE_TYPES
+                    else _to_json_scalar(value)
+                    for key, value in zip(keys, row)
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            print(f"❌ 执行查询时出错: {e}")
+            return None
+
     def get_table_schema(self, table_name: str) -> Optional[Dict[str, Any]]:
         """获取表的结构信息（包括列类型）
 
@@ -262,7 +675,7 @@ class DataManager:
             return None
 
         try:
-            inspector = inspect(self.engine)
+            inspector = self._get_inspector(self.engine)
             columns = inspector.get_columns(table_name)
 
             schema = {
@@ -304,21 +717,7 @@ class DataManager:
 
     def _convert_scalar_numpy_to_native(self, value: Any) -> Any:
         """将单个 NumPy 类型转换为 Python 原生类型"""
-        if value is None or (isinstance(value, float) and np.isnan(value)):
-            return None
-        if isinstance(value, np.generic):
-            dtype = value.dtype
-            if np.issubdtype(dtype, np.integer):
-                return int(value.item())
-            if np.issubdtype(dtype, np.floating):
-                return float(value.item())
-            if np.issubdtype(dtype, np.bool_):
-                return bool(value.item())
-        if isinstance(value, np.datetime64):
-            return str(value)
-        if hasattr(value, "tolist"):
-            return cast(Any, value).tolist()
-        return value
+        return convert_numpy_to_native(value)
 
     def _convert_numpy_to_native(self, df: pd.DataFrame) -> pd.DataFrame:
         """将 DataFrame 中的 NumPy 类型转换为 Python 原生类型
@@ -327,34 +726,36 @@ class DataManager:
             df: 输入的 DataFrame
 
         Returns:
-            转换后的 DataFrame
+            转换后的 DataFrame（object 列，缺失值统一为 None）
         """
-        # 处理 NaN 值
-        df = df.where(pd.notnull(df), None)
-
-        # 转换 NumPy 类型为 Python 原生类型
-        return df.apply(self._convert_scalar_numpy_to_native)
+        if df.shape[1] == 0:
+            return df.astype(object)
+        columns = []
+        for _, series in df.items():
+            # astype(object) 在 C 层把 int64/float64/bool 等转成 Python 原生对象
+            converted = series.astype(object)
+            # NumPy 整数/布尔列不可能有缺失值，跳过掩码；其他列仅在确有缺失时替换为 None
+            if not (isinstance(series.dtype, np.dtype) and series.dtype.kind in "iub"):
+                missing = series.isna()
+                if missing.any():
+                    converted = converted.where(~missing, None)
+            columns.append(converted)
+        result = pd.concat(columns, axis=1)
+        result.columns = df.columns
+        return result
 
     def get_table_list(self) -> List[Dict[str, Any]]:
-        """获取所有数据表列表"""
+        """获取所有数据表列表
+
+        self.metadata 在扫描时已合并元信息库内容，写入/删除时同步更新，
+        这里直接使用，不再逐表查询元信息库；结果缓存到 metadata 下次变化。
+        """
+        if self._table_list_cache is not None:
+            return list(self._table_list_cache)
         table_list = []
-        for table_name, metadata in self.metadata.items():
-            meta_record = self._get_table_metadata_record(table_name)
-            table_comment_cn = (
-                str(meta_record["table_comment_cn"])
-                if meta_record and meta_record.get("table_comment_cn")
-                else metadata.get("table_comment_cn", metadata["name"])
-            )
-            column_comments = (
-                cast(Dict[str, str], meta_record["column_comments"])
-                if meta_record and isinstance(meta_record.get("column_comments"), dict)
-                else metadata.get("column_comments", {})
-            )
-            sample_questions = (
-                cast(List[str], meta_record["sample_questions"])
-                if meta_record and isinstance(meta_record.get("sample_questions"), list)
-                else metadata.get("sample_questions", [])
-            )
+        # 先取快照，迭代期间其他线程导入/删除表不会影响本次遍历
+        for table_name, metadata in list(self.metadata.items()):
+            table_comment_cn = metadata.get("table_comment_cn") or metadata["name"]
             table_list.append(
                 {
                     "name": table_comment_cn,
@@ -364,40 +765,16 @@ class DataManager:
                     "description": metadata["description"],
                     "source": metadata["source"],
                     "table_comment_cn": table_comment_cn,
-                    "column_comments": column_comments,
-                    "sample_questions": sample_questions,
+                    "column_comments": metadata.get("column_comments", {}),
+                    "sample_questions": metadata.get("sample_questions", []),
                 }
             )
-        return table_list
+        self._table_list_cache = table_list
+        return list(table_list)
 
     def get_table_info(self, table_name: str) -> Optional[TableMetadataDict]:
         """获取表详细信息"""
-        if table_name in self.metadata:
-            meta_record = self._get_table_metadata_record(table_name)
-            if meta_record:
-                self.metadata[table_name]["table_comment_cn"] = str(
-                    meta_record.get(
-                        "table_comment_cn",
-                        self.metadata[table_name]["table_comment_cn"],
-                    )
-                )
-                if isinstance(meta_record.get("column_comments"), dict):
-                    self.metadata[table_name]["column_comments"] = cast(
-                        Dict[str, str], meta_record["column_comments"]
-                    )
-                if isinstance(meta_record.get("column_original_names"), dict):
-                    self.metadata[table_name]["column_original_names"] = cast(
-                        Dict[str, str], meta_record["column_original_names"]
-                    )
-                if isinstance(meta_record.get("sample_questions"), list):
-                    self.metadata[table_name]["sample_questions"] = cast(
-                        List[str], meta_record["sample_questions"]
-                    )
-                self.metadata[table_name]["name"] = self.metadata[table_name][
-                    "table_comment_cn"
-                ]
-            return self.metadata[table_name]
-        return None
+        return self.metadata.get(table_name)
 
     def _build_filename_table_base(self, filename: str) -> str:
         """使用文件名（去扩展名）作为表名基础，必要时做 SQL 标识符清洗。"""
@@ -406,29 +783,34 @@ class DataManager:
             file_stem, fallback="uploaded_table", prefix="uploaded"
         )
 
+    @staticmethod
     def _sanitize_sql_identifier(
-        self, value: str, fallback: str = "col", prefix: str = "col"
+        value: Any, fallback: str = "col", prefix: str = "col"
     ) -> str:
-        normalized = re.sub(r"[^a-zA-Z0-9_]+", "_", str(value)).strip("_").lower()
-        if not normalized:
-            normalized = fallback
-        if re.match(r"^[0-9]", normalized):
-            normalized = f"{prefix}_{normalized}"
-        return normalized
-
-    def _table_exists(self, table_name: str) -> bool:
+        # LLM 返回的值可能不是字符串，先转成 str 再走缓存
+        return _sanitize_identifier(str(value), fallback, prefix)
+
+    def _table_exists(
+        self,
+        table_name: str,
+        force_db_check: bool = False,
+        conn: Optional[Connection] = None,
+    ) -> bool:
+        """判断表名是否已被占用。
+
+        默认只查内存 metadata 与 Inspector 缓存的表名列表（建表/删表后失效），
+        重复调用不会反复查询数据库；force_db_check 为 True 时绕过缓存直接查库。
+        传入 conn 时在该连接（及其事务）上直接查库。
+        """
         if table_name in self.metadata:
             return True
+        if conn is not None:
+            return inspect(conn).has_table(table_name)
         if self.engine is None:
             return False
-        with self.engine.connect() as conn:
-            result = conn.execute(
-                text(
-                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name = :name LIMIT 1"
-                ),
-                {"name": table_name},
-            )
-            return result.first() is not None
+        if force_db_check:
+            return inspect(self.engine).has_table(table_name)
+        return table_name in self._get_inspector(self.engine).get_table_names()
 
     def _save_table_metadata(
         self,
@@ -437,172 +819,210 @@ class DataManager:
         column_comments: Dict[str, str],
         column_original_names: Dict[str, str],
         sample_questions: List[str],
+        conn: Optional[Connection] = None,
     ) -> None:
-        if self.meta_engine is None:
+        """写入表的元信息。
+
+        传入 conn 时写在调用方的事务里，失败直接抛出、随调用方一起回滚；
+        否则在元信息库上单独开事务，失败只记录警告。
+        """
+        # 先同步内存中的 metadata，读取路径不再回查元信息库
+        entry = self._metadata.get(table_name)
+        if entry is not None:
+            self._table_list_cache = None
+            entry["name"] = table_comment_cn
+            entry["table_comment_cn"] = table_comment_cn
+            entry["column_comments"] = column_comments
+            entry["column_original_names"] = column_original_names
+            entry["sample_questions"] = sample_questions
+        if conn is None and self.meta_engine is None:
             return
         try:
-            with self.meta_engine.begin() as conn:
-                conn.execute(
-                    text(
-                        """
-                        INSERT INTO table_metadata(table_name, table_comment_cn, updated_at)
-                        VALUES(:table_name, :table_comment_cn, CURRENT_TIMESTAMP)
-                        ON CONFLICT(table_name) DO UPDATE SET
-                            table_comment_cn = excluded.table_comment_cn,
-                            updated_at = CURRENT_TIMESTAMP
-                        """
-                    ),
-                    {"table_name": table_name, "table_comment_cn": table_comment_cn},
-                )
-
-                conn.execute(
-                    text("DELETE FROM column_metadata WHERE table_name = :table_name"),
-                    {"table_name": table_name},
+            if conn is not None:
+                self._write_table_metadata(
+                    conn,
+                    table_name,
+                    table_comment_cn,
+                    column_comments,
+                    column_original_names,
+                    sample_questions,
                 )
-                for column_name, column_comment_cn in column_comments.items():
-                    conn.execute(
-                        text(
-                            """
-                            INSERT INTO column_metadata(table_name, column_name, column_comment_cn, original_name)
-                            VALUES(:table_name, :column_name, :column_comment_cn, :original_name)
-                            """
-                        ),
-                        {
-                            "table_name": table_name,
-                            "column_name": column_name,
-                            "column_comment_cn": column_comment_cn,
-                            "original_name": column_original_names.get(column_name, ""),
-                        },
-                    )
-
-                conn.execute(
-                    text("DELETE FROM sample_questions WHERE table_name = :table_name"),
-                    {"table_name": table_name},
+                return
+            assert self.meta_engine is not None
+            with self.meta_engine.begin() as meta_conn:
+                self._write_table_metadata(
+                    meta_conn,
+                    table_name,
+                    table_comment_cn,
+                    column_comments,
+                    column_original_names,
+                    sample_questions,
                 )
-                for idx, question in enumerate(sample_questions[:4], start=1):
-                    conn.execute(
-                        text(
-                            """
-                            INSERT INTO sample_questions(table_name, question_order, question_text)
-                            VALUES(:table_name, :question_order, :question_text)
-                            """
-                        ),
-                        {
-                            "table_name": table_name,
-                            "question_order": idx,
-                            "question_text": question,
-                        },
-                    )
         except Exception as e:
+            if conn is not None:
+                raise
             logger.warning("Save metadata failed for table %s: %s", table_name, e)
 
+    def _write_table_metadata(
+        self,
+        conn: Connection,
+        table_name: str,
+        table_comment_cn: str,
+        column_comments: Dict[str, str],
+        column_original_names: Dict[str, str],
+        sample_questions: List[str],
+    ) -> None:
+        sql = self._meta_sql
+        conn.execute(
+            sql["upsert_table"],
+            {"table_name": table_name, "table_comment_cn": table_comment_cn},
+        )
+
+        conn.execute(sql["delete_columns"], {"table_name": table_name})
+        # 参数列表交给驱动的 executemany，一次提交所有列
+        column_params = [
+            {
+                "table_name": table_name,
+                "column_name": column_name,
+                "column_comment_cn": column_comment_cn,
+                "original_name": column_original_names.get(column_name, ""),
+            }
+            for column_name, column_comment_cn in column_comments.items()
+        ]
+        if column_params:
+            conn.execute(sql["insert_columns"], column_params)
+
+        conn.execute(sql["delete_questions"], {"table_name": table_name})
+        question_params = [
+            {
+                "table_name": table_name,
+                "question_order": idx,
+                "question_text": question,
+            }
+            for idx, question in enumerate(sample_questions[:4], start=1)
+        ]
+        if question_params:
+            conn.execute(sql["insert_questions"], question_params)
+
     def _get_table_metadata_record(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """读取单表的元信息记录；没有元信息库或读取失败时返回 None。"""
         if self.meta_engine is None:
             return None
         try:
-            with self.meta_engine.connect() as conn:
-                table_row = (
-                    conn.execute(
-                        text(
-                            "SELECT table_comment_cn FROM table_metadata WHERE table_name = :table_name"
-                        ),
-                        {"table_name": table_name},
-                    )
-                    .mappings()
-                    .first()
-                )
+            return self._fetch_table_metadata_record(self.meta_engine, table_name)
+        except Exception as e:
+            logger.warning("Read metadata failed for table %s: %s", table_name, e)
+            return None
 
-                if not table_row:
-                    return None
+    def _load_all_metadata_records(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """用三次批量查询读取全部表的元信息；没有元信息库或读取失败时返回 None。"""
+        if self.meta_engine is None:
+            return None
+        try:
+            return self._get_all_table_metadata_records(self.meta_engine)
+        except Exception as e:
+            logger.warning("Bulk read metadata failed: %s", e)
+            return None
 
-                column_rows = (
-                    conn.execute(
-                        text(
-                            """
-                        SELECT column_name, column_comment_cn, COALESCE(original_name, column_name) AS original_name
-                        FROM column_metadata
-                        WHERE table_name = :table_name
-                        """
-                        ),
-                        {"table_name": table_name},
-                    )
-                    .mappings()
-                    .all()
-                )
+    def _get_all_table_metadata_records(
+        self, meta_engine: Engine
+    ) -> Dict[str, Dict[str, Any]]:
+        """批量读取所有表的元信息记录（固定三次查询，与表数量无关）。"""
+        sql = self._meta_sql
+        with meta_engine.connect() as conn:
+            table_rows = conn.execute(sql["select_all_tables"]).all()
+            column_rows = conn.execute(sql["select_all_columns"]).all()
+            question_rows = conn.execute(sql["select_all_questions"]).all()
+
+        column_comments: Dict[str, Dict[str, str]] = defaultdict(dict)
+        column_original_names: Dict[str, Dict[str, str]] = defaultdict(dict)
+        for table_name, column_name, column_comment_cn, original_name in column_rows:
+            column_comments[table_name][str(column_name)] = str(column_comment_cn)
+            column_original_names[table_name][str(column_name)] = str(original_name)
+        sample_questions: Dict[str, List[str]] = defaultdict(list)
+        for table_name, question_text in question_rows:
+            sample_questions[table_name].append(str(question_text))
+
+        return {
+            str(table_name): {
+                "table_comment_cn": str(table_comment_cn),
+                "column_comments": column_comments.get(table_name, {}),
+                "column_original_names": column_original_names.get(table_name, {}),
+                "sample_questions": sample_questions.get(table_name, []),
+            }
+            for table_name, table_comment_cn in table_rows
+        }
 
-                question_rows = (
-                    conn.execute(
-                        text(
-                            """
-                        SELECT question_text
-                        FROM sample_questions
-                        WHERE table_name = :table_name
-                        ORDER BY question_order ASC
-                        """
-                        ),
-                        {"table_name": table_name},
-                    )
-                    .mappings()
-                    .all()
-                )
+    def _fetch_table_metadata_record(
+        self, meta_engine: Engine, table_name: str
+    ) -> Optional[Dict[str, Any]]:
+        """从元信息库读取单表记录，出错时直接抛出。"""
+        sql = self._meta_sql
+        params = {"table_name": table_name}
+        with meta_engine.connect() as conn:
+            table_comment_cn = conn.execute(sql["select_table"], params).scalar()
 
-                return {
-                    "table_comment_cn": str(table_row["table_comment_cn"]),
-                    "column_comments": {
-                        str(row["column_name"]): str(row["column_comment_cn"])
-                        for row in column_rows
-                    },
-                    "column_original_names": {
-                        str(row["column_name"]): str(row["original_name"])
-                        for row in column_rows
-                    },
-                    "sample_questions": [
-                        str(row["question_text"]) for row in question_rows
-                    ],
-                }
-        except Exception as e:
-            logger.warning("Read metadata failed for table %s: %s", table_name, e)
-            return None
+            if table_comment_cn is None:
+                return None
+
+            column_rows = conn.execute(sql["select_columns"], params).all()
+            question_texts = (
+                conn.execute(sql["select_questions"], params).scalars().all()
+            )
+
+        # 按位置解包，一次遍历同时生成两份映射
+        column_comments: Dict[str, str] = {}
+        column_original_names: Dict[str, str] = {}
+        for column_name, column_comment_cn, original_name in column_rows:
+            column_comments[str(column_name)] = str(column_comment_cn)
+            column_original_names[str(column_name)] = str(original_name)
+
+        return {
+            "table_comment_cn": str(table_comment_cn),
+            "column_comments": column_comments,
+            "column_original_names": column_original_names,
+            "sample_questions": [str(question) for question in question_texts],
+        }
 
     def _delete_table_metadata(self, table_name: str) -> None:
+        self._metadata.pop(table_name, None)
+        self._table_list_cache = None
         if self.meta_engine is None:
             return
+        sql = self._meta_sql
+        params = {"table_name": table_name}
         try:
             with self.meta_engine.begin() as conn:
-                conn.execute(
-                    text("DELETE FROM table_metadata WHERE table_name = :table_name"),
-                    {"table_name": table_name},
-                )
-                conn.execute(
-                    text("DELETE FROM column_metadata WHERE table_name = :table_name"),
-                    {"table_name": table_name},
-                )
-                conn.execute(
-                    text("DELETE FROM sample_questions WHERE table_name = :table_name"),
-                    {"table_name": table_name},
-                )
+                for key in ("delete_table", "delete_columns", "delete_questions"):
+                    conn.execute(sql[key], params)
         except Exception as e:
             logger.warning("Delete metadata failed for table %s: %s", table_name, e)
 
-    def _generate_unique_table_name(self, base_name: str) -> str:
+    def _generate_unique_table_name(
+        self, base_name: str, conn: Optional[Connection] = None
+    ) -> str:
         base_candidate = self._sanitize_sql_identifier(
             base_name, fallback="uploaded_table", prefix="uploaded"
         )
         candidate = base_candidate
         suffix = 1
-        while self._table_exists(candidate):
+        # 上传随后会整表覆盖写入（if_exists="replace"），先刷新一次表名缓存，
+        # 避免覆盖库外新建的表；之后的重名循环都只查内存。
+        # 传入 conn 时直接在写入所在的事务里查库，检查与建表之间不会有别的写入
+        if conn is None:
+            self._invalidate_schema_cache()
+        while self._table_exists(candidate, conn=conn):
             suffix += 1
             candidate = f"{base_candidate}_{suffix}"
         return candidate
 
     def _safe_json_loads(self, raw: str) -> Optional[Dict[str, Any]]:
-        text_content = raw.strip().replace("```json", "").replace("```", "").strip()
-        start = text_content.find("{")
-        end = text_content.rfind("}")
-        if start >= 0 and end > start:
-            text_content = text_content[start : end + 1]
+        # 从第一个 "{" 开始解析一个完整 JSON 值，前面的 ``` 围栏和后面多余的文字都会被跳过
+        start = raw.find("{")
+        if start < 0:
+            return None
         try:
-            value = json.loads(text_content)
+            value, _ = _JSON_DECODER.raw_decode(raw, start)
             return value if isinstance(value, dict) else None
         except Exception:
             return None
@@ -620,14 +1040,85 @@ class DataManager:
             f"{table_comment_cn}里是否有异常值或缺失值？",
         ]
 
+    def _get_cached_naming_plan(self, cache_key: NamingPlanKey) -> Optional[NamingPlan]:
+        with self._naming_plan_lock:
+            plan = self._naming_plan_cache.get(cache_key)
+            if plan is not None:
+                self._naming_plan_cache.move_to_end(cache_key)
+            return plan
+
+    def _cache_naming_plan(self, cache_key: NamingPlanKey, plan: NamingPlan) -> None:
+        with self._naming_plan_lock:
+            self._naming_plan_cache[cache_key] = plan
+            self._naming_plan_cache.move_to_end(cache_key)
+            if len(self._naming_plan_cache) > self.NAMING_PLAN_CACHE_SIZE:
+                self._naming_plan_cache.popitem(last=False)
+
+    @staticmethod
+    def _naming_plan_digest(cache_key: NamingPlanKey) -> str:
+        file_stem, columns = cache_key
+        payload = json.dumps([file_stem, list(columns)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_naming_plan(self, cache_key: NamingPlanKey) -> Optional[NamingPlan]:
+        """从元信息库读取持久化的命名方案，进程重启后重复上传也不必再调用 LLM"""
+        if self.meta_engine is None:
+            return None
+        try:
+            with self.meta_engine.connect() as conn:
+                plan_json = conn.execute(
+                    self._meta_sql["select_naming_plan"],
+                    {"cache_key": self._naming_plan_digest(cache_key)},
+                ).scalar()
+        except Exception as e:
+            logger.warning(f"Load naming plan failed: {e}")
+            return None
+        return cast(NamingPlan, json.loads(plan_json)) if plan_json else None
+
+    def _store_naming_plan(self, cache_key: NamingPlanKey, plan: NamingPlan) -> None:
+        if self.meta_engine is None:
+            return
+        try:
+            with self.meta_engine.begin() as conn:
+                conn.execute(
+                    self._meta_sql["upsert_naming_plan"],
+                    {
+                        "cache_key": self._naming_plan_digest(cache_key),
+                        "plan_json": json.dumps(plan, ensure_ascii=False),
+                    },
+                )
+        except Exception as e:
+            logger.warning(f"Save naming plan failed: {e}")
+
     def _generate_naming_plan(
         self,
         filename: str,
         original_columns: List[str],
-        sample_rows: List[Dict[str, Any]],
+        sample_rows: List[List[Any]],
     ) -> Optional[NamingPlan]:
-        if not self.llm or not original_columns:
+        """向 LLM 请求命名方案；返回 None 时由调用方按文件名与原列名本地命名"""
+        if not original_columns:
+            return None
+        strategy = self.settings.naming_llm_strategy
+        if strategy == "never":
             return None
+        file_stem = os.path.splitext(os.path.basename(filename))[0]
+        if strategy == "lazy" and all(
+            _PLAIN_IDENT_RE.match(name) for name in (file_stem, *original_columns)
+        ):
+            # 名称本身已是合法英文标识符，本地规则命名即可
+            return None
+        if not self.llm:
+            return None
+
+        cache_key = (file_stem, tuple(sorted(original_columns)))
+        cached_plan = self._get_cached_naming_plan(cache_key)
+        if cached_plan is not None:
+            return cached_plan
+        cached_plan = self._load_naming_plan(cache_key)
+        if cached_plan is not None:
+            self._cache_naming_plan(cache_key, cached_plan)
+            return cached_plan
 
         payload = {
             "filename": filename,
@@ -659,7 +1150,8 @@ class DataManager:
             "2) Keep semantic meaning.\n"
             "3) sample_questions must contain exactly 4 practical analysis questions in Chinese.\n"
             "4) Return JSON only.\n"
-            f"Input: {json.dumps(payload, ensure_ascii=False)}"
+            "Each sample_rows item lists one row's values in columns order.\n"
+            f"Input: {json.dumps(payload, ensure_ascii=False, default=str)}"
         )
         try:
             response = self.llm.invoke(prompt)
@@ -680,40 +1172,121 @@ class DataManager:
                 parsed.get("sample_questions"), list
             ):
                 return None
-            return cast(NamingPlan, parsed)
+            plan = cast(NamingPlan, parsed)
+            # 只缓存成功的方案，LLM 调用失败时下次仍会重试
+            self._cache_naming_plan(cache_key, plan)
+            self._store_naming_plan(cache_key, plan)
+            return plan
         except Exception as e:
             logger.warning(f"LLM naming fallback: {e}")
             return None
 
-    def _infer_column_type(self, values: List[Any]) -> str:
-        non_null_values = [v for v in values if v is not None and str(v).strip() != ""]
+    @staticmethod
+    def _infer_typed_column_type(non_null: pd.Series) -> Optional[str]:
+        """按已解析出的列类型直接判断，结果与逐值字符串判断一致；无法判断时返回 None"""
+        if non_null.empty:
+            return None
+        dtype = non_null.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            return "boolean"
+        if pd.api.types.is_integer_dtype(dtype):
+            # 只含 0/1 的整数列按字符串规则会被视为布尔
+            return "boolean" if non_null.isin([0, 1]).mean() > 0.8 else "number"
+        if pd.api.types.is_float_dtype(dtype):
+            return "number"
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            # 日期时间值转成字符串后总能被 to_datetime 解析
+            return "date"
+        return None
+
+    def _infer_column_type(self, values: Union[List[Any], pd.Series]) -> str:
+        # 传入 Series 时先按列类型直接判断，只有 object/字符串列才走逐值判断；
+        # 逐值判断也只把抽样转成 list，不必先把整列转成 Python 对象
+        if isinstance(values, pd.Series):
+            non_null: Union[List[Any], pd.Series] = values.dropna()
+            typed = self._infer_typed_column_type(non_null)
+            if typed is not None:
+                return typed
+        else:
+            non_null = [v for v in values if v is not None]
+        # 大列只按等间隔抽样判断，比例阈值不受样本大小影响
+        step = max(1, -(-len(non_null) // self.TYPE_INFERENCE_SAMPLE_SIZE))
+        sample = (
+            non_null.iloc[::step].tolist()
+            if isinstance(non_null, pd.Series)
+            else non_null[::step]
+        )
+        non_null_values = [v for v in sample if str(v).strip() != ""]
         if not non_null_values:
             return "string"
 
-        bool_count = sum(
-            str(v).lower() in {"true", "false", "0", "1"} or isinstance(v, bool)
-            for v in non_null_values
-        )
-        if bool_count / len(non_null_values) > 0.8:
+        # 整列一次性向量化判断，阈值与逐值判断时保持一致
+        total = len(non_null_values)
+        series = pd.Series(non_null_values, dtype=object)
+        text = series.astype(str)
+
+        bool_count = int(text.str.lower().isin(_BOOL_STRINGS).sum())
+        if bool_count / total > 0.8:
             return "boolean"
 
-        num_count = 0
-        for v in non_null_values:
-            try:
-                float(str(v))
-                num_count += 1
-            except Exception:
-                continue
-        if num_count / len(non_null_values) > 0.8:
+        # float(str(v)) 能解析的都算数字：to_numeric 不认 "nan"、下划线分隔和全角数字，单独补上
+        numeric_mask = pd.to_numeric(text, errors="coerce").notna()
+        numeric_mask |= text.str.strip().str.lower().isin(_NAN_STRINGS)
+        leftover = text[~numeric_mask & text.str.contains(r"[^\x00-\x7f]|_")]
+        num_count = int(numeric_mask.sum()) + sum(
+            _parses_as_float(v) for v in leftover
+        )
+        if num_count / total > 0.8:
             return "number"
 
-        date_count = sum(
-            pd.notna(pd.to_datetime(v, errors="coerce")) for v in non_null_values
+        date_count = int(
+            pd.to_datetime(series, errors="coerce", format="mixed").notna().sum()
         )
-        if date_count / len(non_null_values) > 0.8:
+        if date_count / total > 0.8:
             return "date"
         return "string"
 
+    @staticmethod
+    def _read_uploaded_frame(file_content: bytes, file_type: str) -> pd.DataFrame:
+        """读取上传文件，安装了 pyarrow 时使用 Arrow 解析与 Arrow 类型"""
+        if file_type == "csv":
+            if _HAS_PYARROW:
+                try:
+                    df = pd.read_csv(
+                        BytesIO(file_content),
+                        engine="pyarrow",
+                        dtype_backend="pyarrow",
+                    )
+                except Exception as e:
+                    # pyarrow 解析器对编码和不规则行更严格，失败时退回默认解析器
+                    logger.warning(f"pyarrow 解析 CSV 失败，改用默认解析器: {e}")
+                else:
+                    # 默认解析器会把重复表头改名为 a、a.1…，pyarrow 不会；
+                    # 有重复表头时退回默认解析器，保持列名一致
+                    if df.columns.has_duplicates:
+                        return pd.read_csv(BytesIO(file_content))
+                    # pyarrow 会把日期/时间列解析成 timestamp/time，再转字符串会改写原文
+                    # （如 "T" 分隔符、"10:00" 补秒、小数秒补到纳秒）；这些列改用
+                    # 默认解析器按字符串重读，入库文本与默认解析器完全一致
+                    temporal = [
+                        i
+                        for i, col in enumerate(df.columns)
+                        if _is_temporal_dtype(df[col].dtype)
+                    ]
+                    if temporal:
+                        import pyarrow as pa
+
+                        raw = pd.read_csv(
+                            BytesIO(file_content), usecols=temporal, dtype=str
+                        )
+                        for i, col in zip(temporal, raw.columns):
+                            df.isetitem(i, raw[col].astype(pd.ArrowDtype(pa.string())))
+                    return df
+            return pd.read_csv(BytesIO(file_content))
+        if _HAS_PYARROW:
+            return read_excel_bytes(file_content, dtype_backend="pyarrow")
+        return read_excel_bytes(file_content)
+
     def import_uploaded_file(
         self, file_content: bytes, file_type: str, filename: str | None
     ) -> Dict[str, Any]:
@@ -722,15 +1295,12 @@ class DataManager:
             return {"success": False, "error": "数据库引擎未初始化"}
 
         try:
-            if file_type == "csv":
-                df = pd.read_csv(BytesIO(file_content))
-            elif file_type in ["excel", "xlsx", "xls"]:
-                df = pd.read_excel(BytesIO(file_content))
-            else:
+            if file_type not in ["csv", "excel", "xlsx", "xls"]:
                 return {
                     "success": False,
                     "error": f"Unsupported file type: {file_type}",
                 }
+            df = self._read_uploaded_frame(file_content, file_type)
 
             if df.empty:
                 return {"success": False, "error": "Uploaded file is empty"}
@@ -738,9 +1308,12 @@ class DataManager:
             safe_filename = filename or "uploaded_file"
             safe_filename_stem = os.path.splitext(os.path.basename(safe_filename))[0]
             original_columns = [str(col) for col in df.columns]
+            # 先截取前 3 行再处理缺失值，避免对整表做一次 notnull；
+            # 样例行只给值列表，与 columns 按位置对应，不再每行重复列名
+            head = df.head(3).astype(object)
             sample_rows = cast(
-                List[Dict[str, Any]],
-                df.head(3).where(pd.notnull(df), None).to_dict(orient="records"),  # type: ignore
+                List[List[Any]],
+                head.where(head.notna(), None).values.tolist(),  # type: ignore
             )
 
             naming_plan = self._generate_naming_plan(
@@ -757,9 +1330,6 @@ class DataManager:
                 if isinstance(naming_plan, dict)
                 else None
             ) or safe_filename_stem
-            table_name = self._generate_unique_table_name(
-                table_name_from_llm or self._build_filename_table_base(safe_filename)
-            )
             sample_questions = []
             if naming_plan and isinstance(naming_plan.get("sample_questions"), list):
                 sample_questions = [
@@ -787,6 +1357,8 @@ class DataManager:
                         }
 
             used_columns: Set[str] = set()
+            # 每个基础名已用到的最大后缀，重名时从这里继续找，避免每次从 _2 重新试
+            next_suffix: Dict[str, int] = {}
             renamed_columns: List[str] = []
             column_comments: Dict[str, str] = {}
             column_original_names: Dict[str, str] = {}
@@ -798,10 +1370,11 @@ class DataManager:
                     prefix="col",
                 )
                 base_target = target
-                suffix = 1
+                suffix = next_suffix.get(base_target, 1)
                 while target in used_columns:
                     suffix += 1
                     target = f"{base_target}_{suffix}"
+                next_suffix[base_target] = suffix
                 used_columns.add(target)
                 renamed_columns.append(target)
                 column_comments[target] = suggestion.get(
@@ -810,22 +1383,63 @@ class DataManager:
                 column_original_names[target] = source_col
 
             df.columns = renamed_columns
-            df.to_sql(table_name, self.engine, if_exists="replace", index=False)
+            is_sqlite = self.engine.dialect.name == "sqlite"
+            # SQLite 且没有日期时间列时直接走驱动的 executemany；日期时间列仍交给
+            # SQLAlchemy 的类型处理，保证入库的文本格式不变
+            use_executemany = is_sqlite and not any(
+                _is_temporal_dtype(dtype) for dtype in df.dtypes
+            )
+            # 元信息库挂载在业务引擎上时，元信息与数据表写在同一个事务里
+            meta_in_txn = self.meta_engine is self.engine
+            # 查重名、建表写数据、写元信息共用一个连接和事务，任一步失败整体回滚
+            with self.engine.begin() as conn:
+                if is_sqlite:
+                    # pysqlite 只在 DML 前自动开启事务，DROP/CREATE TABLE 会各自提交；
+                    # 显式 BEGIN 让建表也落在同一个事务里
+                    conn.exec_driver_sql("BEGIN")
+                table_name = self._generate_unique_table_name(
+                    table_name_from_llm
+                    or self._build_filename_table_base(safe_filename),
+                    conn=conn,
+                )
+                df.to_sql(
+                    table_name,
+                    conn,
+                    if_exists="replace",
+                    index=False,
+                    chunksize=UPLOAD_WRITE_CHUNK_SIZE,
+                    method=_executemany_insert if use_executemany else None,
+                )
+                if meta_in_txn:
+                    self._save_table_metadata(
+                        table_name=table_name,
+                        table_comment_cn=table_comment_cn,
+                        column_comments=column_comments,
+                        column_original_names=column_original_names,
+                        sample_questions=sample_questions,
+                        conn=conn,
+                    )
+            self._invalidate_schema_cache()
             columns_list = [str(col) for col in df.columns]
 
+            # 空值数整表一次算出，不再逐列复制成 list 再包一层 Series
+            total_rows = len(df)
+            non_null_counts = df.notna().sum()
             column_info: List[Dict[str, Any]] = []
             for col in columns_list:
-                values = df[col].tolist()
-                non_null_values = [v for v in values if pd.notna(v)]
+                # dropna 同时去掉 NaN 与 Arrow 列的 pd.NA
+                non_null = df[col].dropna()
                 sample_values = [
-                    self._convert_scalar_numpy_to_native(v) for v in non_null_values[:5]
+                    self._convert_scalar_numpy_to_native(v)
+                    for v in non_null.head(5).tolist()
                 ]
                 column_info.append(
                     {
                         "name": col,
-                        "type": self._infer_column_type(values),
-                        "nullable": len(non_null_values) < len(values),
-                        "unique_values": int(pd.Series(values).nunique(dropna=False)),
+                        "type": self._infer_column_type(non_null),
+                        "nullable": int(non_null_counts[col]) < total_rows,
+                        # unique() 把缺失值算作一个取值，与 nunique(dropna=False) 一致且更快
+                        "unique_values": len(df[col].unique()),
                         "sample_values": sample_values,
                         "comment_cn": column_comments.get(col),
                         "original_name": column_original_names.get(col),
@@ -843,13 +1457,15 @@ class DataManager:
                 "column_original_names": column_original_names,
                 "sample_questions": sample_questions,
             }
-            self._save_table_metadata(
-                table_name=table_name,
-                table_comment_cn=table_comment_cn,
-                column_comments=column_comments,
-                column_original_names=column_original_names,
-                sample_questions=sample_questions,
-            )
+            self._table_list_cache = None
+            if not meta_in_txn:
+                self._save_table_metadata(
+                    table_name=table_name,
+                    table_comment_cn=table_comment_cn,
+                    column_comments=column_comments,
+                    column_original_names=column_original_names,
+                    sample_questions=sample_questions,
+                )
 
             return {
                 "success": True,
@@ -876,6 +1492,7 @@ class DataManager:
         try:
             with self.engine.begin() as conn:
                 conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+            self._invalidate_schema_cache()
 
             if table_name in self.data_cache:
                 del self.data_cache[table_name]
@@ -888,5 +1505,6 @@ class DataManager:
             return {"success": False, "error": str(e)}
 
 
-# 创建全局数据管理器实例
-data_manager = DataManager()
+# 创建全局数据管理器实例；LLM、元信息库与表扫描在首次使用时初始化，
+# 仅导入本模块（测试收集、命令行工具）不会连接数据库
+data_manager = DataManager(eager=False)
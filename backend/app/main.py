@@ -1,12 +1,13 @@
 import asyncio
 import json
 import logging
-import os
 import re
+import threading
 import time
 import uuid
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
@@ -14,9 +15,10 @@ from fastapi.responses import StreamingResponse
 from langchain_community.utilities import SQLDatabase
 from utils.file_processor import FileProcessor
 
-from app.config import settings
+from app.config import get_settings, is_debug
 from app.mlflow_debugger import mlflow_debugger
 from app.models import (
+    ChartType,
     ChatMessage,
     ChatRequest,
     ChatResponse,
@@ -35,6 +37,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_TABLE_NAME_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+
 # 尝试导入 data_manager
 DATA_MANAGER_AVAILABLE = False
 data_manager = None
@@ -49,7 +53,52 @@ except Exception as e:
 
 # 全局存储
 chat_sessions: Dict[str, Dict] = {}
-sql_agents: Dict[str, SQLAgentManager] = {}
+# 按表缓存的 SQL Agent，按最近使用淘汰；所有 Agent 共用 data_manager.agent_engine
+sql_agents: "OrderedDict[str, SQLAgentManager]" = OrderedDict()
+MAX_CACHED_AGENTS = 64
+# sql_agents 会被 to_thread 的工作线程与事件循环同时访问；查找/插入/淘汰在锁内进行，
+# 创建 Agent 不持有全局锁，只用按表的锁避免同一张表被并发重复创建
+_sql_agents_lock = threading.Lock()
+_agent_build_locks: Dict[str, threading.Lock] = {}
+
+
+def _get_cached_agent(agent_key: str) -> Optional[SQLAgentManager]:
+    with _sql_agents_lock:
+        agent = sql_agents.get(agent_key)
+        if agent is not None:
+            sql_agents.move_to_end(agent_key)
+        return agent
+
+
+def _agent_build_lock(agent_key: str) -> threading.Lock:
+    with _sql_agents_lock:
+        return _agent_build_locks.setdefault(agent_key, threading.Lock())
+
+
+def _build_agent(table_name: str) -> SQLAgentManager:
+    assert data_manager is not None
+    settings = get_settings()
+    agent = SQLAgentManager(
+        openai_api_key=settings.openai_api_key,
+        openai_base_url=settings.openai_base_url,
+        model=settings.reasoning_model,
+        temperature=settings.reasoning_temperature,
+    )
+
+    # 所有 Agent 共用一个不挂载元信息库的引擎，不再为每张表新建引擎和连接池；
+    # 表结构在 Agent 真正查看时才反射
+    agent_engine = data_manager.agent_engine
+    agent.db = SQLDatabase(agent_engine, lazy_table_reflection=True)
+    # 创建 SQLAlchemy 连接用于 execute_sql
+    agent.db_connection = agent_engine
+
+    # 创建SQL Agent
+    agent_result = agent.create_sql_agent()
+    if not agent_result["success"]:
+        raise HTTPException(status_code=500, detail=agent_result["error"])
+
+    logger.info(f"Created SQL Agent for table: {table_name}")
+    return agent
 
 
 def _resolve_or_create_agent(request: QueryRequest) -> tuple[str, SQLAgentManager]:
@@ -66,32 +115,26 @@ def _resolve_or_create_agent(request: QueryRequest) -> tuple[str, SQLAgentManage
                 detail="Database not found. Please initialize the database first.",
             )
 
-        # 获取或创建SQL Agent
-        if agent_key not in sql_agents:
-            agent = SQLAgentManager(
-                openai_api_key=settings.openai_api_key,
-                openai_base_url=settings.openai_base_url,
-                model=settings.reasoning_model,
-                temperature=settings.reasoning_temperature,
-            )
-
-            # 连接到现有数据库
-            agent.db = SQLDatabase.from_uri(data_manager.db_url)
-            # 创建 SQLAlchemy 连接用于 execute_sql
-            agent.db_connection = data_manager.engine
-
-            # 创建SQL Agent
-            agent_result = agent.create_sql_agent()
-            if not agent_result["success"]:
-                raise HTTPException(status_code=500, detail=agent_result["error"])
-
-            sql_agents[agent_key] = agent
-            logger.info(f"Created SQL Agent for table: {request.table_name}")
+        # 获取或创建SQL Agent；同一张表的并发请求在按表的锁上等待，拿到锁后再查一次缓存
+        agent = _get_cached_agent(agent_key)
+        if agent is None:
+            evicted_agents: List[SQLAgentManager] = []
+            with _agent_build_lock(agent_key):
+                agent = _get_cached_agent(agent_key)
+                if agent is None:
+                    agent = _build_agent(request.table_name)
+                    with _sql_agents_lock:
+                        sql_agents[agent_key] = agent
+                        while len(sql_agents) > MAX_CACHED_AGENTS:
+                            evicted_agents.append(sql_agents.popitem(last=False)[1])
+            for evicted in evicted_agents:
+                evicted.cleanup()
 
     else:
         raise HTTPException(status_code=400, detail="table_name must be provided")
 
-    return agent_key, sql_agents[agent_key]
+    # 返回本地引用：字典里的条目可能已被其他线程淘汰
+    return agent_key, agent
 
 
 def _run_query(request: QueryRequest) -> Dict[str, Any]:
@@ -119,20 +162,8 @@ def _run_query(request: QueryRequest) -> Dict[str, Any]:
     if answer:
         logger.info(f"Answer preview: {answer[:200]}...")
 
-    # 如果有 SQL 但没有数据，尝试执行 SQL 获取数据
-    if sql and not data:
-        try:
-            logger.info(f"Executing SQL to get data: {sql[:100]}...")
-            sql_result = agent.execute_sql(sql)
-            if sql_result["success"]:
-                data = sql_result["data"]
-                columns = sql_result["columns"]
-                logger.info(f"SQL execution successful: {len(data)} rows retrieved")
-        except Exception as e:
-            logger.warning(f"Could not execute SQL to get data: {e}")
-            import traceback
-
-            traceback.print_exc()
+    # query_data 已执行过提取出的 SQL，data/columns 就是该 SQL 的结果；
+    # 结果为空（0 行或执行失败）时不再重复执行同一条 SQL
 
     # 确保数据格式正确
     if data and not columns:
@@ -160,10 +191,8 @@ def _to_sse(event: str, payload: Dict[str, Any]) -> str:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 创建必要的目录
-    os.makedirs("data/uploads", exist_ok=True)
-    os.makedirs("data/visualizations", exist_ok=True)
-
+    # 数据目录由 get_settings() 首次加载时统一创建
+    settings = get_settings()
     mlflow_debugger.configure(
         enabled=settings.mlflow_enabled,
         tracking_uri=settings.mlflow_tracking_uri,
@@ -173,7 +202,10 @@ async def lifespan(app: FastAPI):
     logger.info("Application startup complete")
     yield
     # 清理资源
-    for agent in sql_agents.values():
+    with _sql_agents_lock:
+        agents = list(sql_agents.values())
+        sql_agents.clear()
+    for agent in agents:
         agent.cleanup()
     logger.info("Application shutdown complete")
 
@@ -204,7 +236,8 @@ async def get_data_sources():
     # 获取数据库表
     if DATA_MANAGER_AVAILABLE and data_manager:
         try:
-            db_tables = data_manager.get_table_list()
+            # 首次访问会扫描数据库，放到线程池里执行，不阻塞事件循环
+            db_tables = await asyncio.to_thread(data_manager.get_table_list)
             sources.extend(db_tables)
         except Exception as e:
             logger.error(f"Error getting database tables: {e}")
@@ -215,26 +248,27 @@ async def get_data_sources():
 @app.delete("/tables/{table_name}")
 async def delete_table(table_name: str):
     """删除数据库表（仅数据库中的物理表，不包含上传文件缓存）"""
-    if not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", table_name):
+    if not _TABLE_NAME_RE.match(table_name):
         raise HTTPException(status_code=400, detail="Invalid table name")
 
     if not DATA_MANAGER_AVAILABLE or not data_manager:
         raise HTTPException(status_code=500, detail="Data manager is not available")
 
-    table_info = data_manager.get_table_info(table_name)
+    table_info = await asyncio.to_thread(data_manager.get_table_info, table_name)
     if not table_info:
         raise HTTPException(status_code=404, detail="Table not found")
 
-    result = data_manager.delete_table(table_name)
+    result = await asyncio.to_thread(data_manager.delete_table, table_name)
     if not result.get("success"):
         raise HTTPException(
             status_code=500, detail=result.get("error", "Delete table failed")
         )
 
-    agent_key = f"table_{table_name}"
-    if agent_key in sql_agents:
-        sql_agents[agent_key].cleanup()
-        del sql_agents[agent_key]
+    with _sql_agents_lock:
+        agent = sql_agents.pop(f"table_{table_name}", None)
+        _agent_build_locks.pop(f"table_{table_name}", None)
+    if agent is not None:
+        agent.cleanup()
 
     return {"success": True, "message": result.get("message", "Table deleted")}
 
@@ -252,15 +286,29 @@ async def upload_file(file: UploadFile = File(...)):
         if file_type not in ["csv", "xlsx", "xls"]:
             raise HTTPException(status_code=400, detail="Unsupported file type")
 
-        # 读取文件内容
+        # 读取文件内容；上传已被 Starlette 暂存到临时文件，
+        # 先按已知大小拒绝超限文件，避免把整个超大文件读进内存
+        settings = get_settings()
+        if file.size is not None and file.size > settings.max_file_size_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {settings.max_file_size} upload limit",
+            )
         content = await file.read()
+        if len(content) > settings.max_file_size_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {settings.max_file_size} upload limit",
+            )
         file_type_str = "csv" if file_type == "csv" else "excel"
 
         if not DATA_MANAGER_AVAILABLE or not data_manager:
             raise HTTPException(status_code=500, detail="Data manager is not available")
 
         # 先获取列信息（用于前端展示）
-        header_result = FileProcessor.get_file_headers(content, file_type_str)
+        header_result = await asyncio.to_thread(
+            FileProcessor.get_file_headers, content, file_type_str
+        )
         if not header_result["success"]:
             raise HTTPException(status_code=500, detail=header_result["error"])
 
@@ -307,15 +355,18 @@ async def query_data(request: QueryRequest):
     使用自然语言查询数据（支持文件上传和数据库表）
     """
     try:
-        return QueryResponse(**_run_query(request))
+        # _run_query 已按 QueryResponse 校验并导出；response_model 会负责序列化，
+        # 这里不再用结果重新构造一次模型
+        return await asyncio.to_thread(_run_query, request)
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error querying data: {str(e)}")
-        import traceback
+        if is_debug():
+            import traceback
 
-        traceback.print_exc()
+            traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -350,10 +401,11 @@ async def query_data_stream(request: QueryRequest):
             result = await query_task
             answer = result.get("answer") or ""
 
-            if answer:
-                for i in range(0, len(answer), 24):
-                    yield _to_sse("answer_delta", {"delta": answer[i : i + 24]})
-                    await asyncio.sleep(0.01)
+            # 答案已完整生成，不再人为按固定间隔放慢推送，由网络本身限速；
+            # 每块之后让出一次事件循环，避免长答案占住循环
+            for i in range(0, len(answer), 256):
+                yield _to_sse("answer_delta", {"delta": answer[i : i + 256]})
+                await asyncio.sleep(0)
 
             yield _to_sse("result", result)
             yield _to_sse("done", {"message": "查询完成"})
@@ -366,7 +418,81 @@ async def query_data_stream(request: QueryRequest):
             logger.error(f"Error streaming query: {e}")
             yield _to_sse("error", {"message": str(e)})
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        # 禁止缓存与 nginx 等反向代理缓冲，事件到达即转发
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _visualization_columns(
+    request: VisualizationRequest, table_columns: List[str]
+) -> Optional[List[str]]:
+    """图表实际用到的列；需要整行数据时返回 None
+
+    未指定的坐标轴要从整行中按位置/类型挑选默认列，散点图把其余列都放进悬停信息，
+    热力图使用全部数值列，这些情况仍然 SELECT *。
+    """
+    if request.chart_type in (ChartType.BAR, ChartType.LINE):
+        required = [request.x_column, request.y_column]
+        optional = [request.group_by]
+    elif request.chart_type == ChartType.PIE:
+        required = [request.x_column]
+        optional = [request.y_column]
+    elif request.chart_type == ChartType.HISTOGRAM:
+        required = [request.x_column]
+        optional = []
+    elif request.chart_type == ChartType.BOX:
+        required = [request.x_column]
+        optional = [request.group_by]
+    else:
+        return None
+    if not all(required):
+        return None
+    columns = list(dict.fromkeys(col for col in required + optional if col))
+    # 列名不存在时保持 SELECT *，由绘图阶段报出与原来一致的错误
+    if not set(columns).issubset(table_columns):
+        return None
+    return columns
+
+
+def _run_visualization(request: VisualizationRequest) -> str:
+    """查询表数据并生成图表，返回图表 HTML"""
+    if not DATA_MANAGER_AVAILABLE or not data_manager:
+        raise HTTPException(status_code=500, detail="Data manager is not available")
+
+    table_info = data_manager.get_table_info(request.table_name)
+    if not table_info:
+        raise HTTPException(status_code=404, detail="Table not found")
+
+    # 只取图表用到的列，宽表不再整行读出后丢弃大部分字段
+    columns = _visualization_columns(request, table_info["columns"])
+    select_list = (
+        ", ".join('"{}"'.format(col.replace('"', '""')) for col in columns)
+        if columns
+        else "*"
+    )
+    query = f'SELECT {select_list} FROM "{request.table_name}" LIMIT {request.limit}'
+    records = data_manager.execute_query_records(query)
+    if records is None:
+        raise HTTPException(status_code=500, detail="Failed to query table data")
+    data_result = {"success": True, "data": records}
+
+    # 创建可视化
+    viz_result = DataVisualizer.create_chart(
+        data_result["data"],
+        request.chart_type,
+        request.x_column,
+        request.y_column,
+        request.group_by,
+        request.title,
+    )
+
+    if not viz_result["success"]:
+        raise HTTPException(status_code=500, detail=viz_result["error"])
+
+    return viz_result["chart_html"]
 
 
 @app.post("/visualize", response_model=VisualizationResponse)
@@ -375,33 +501,8 @@ async def create_visualization(request: VisualizationRequest):
     创建数据可视化图表
     """
     try:
-        if not DATA_MANAGER_AVAILABLE or not data_manager:
-            raise HTTPException(status_code=500, detail="Data manager is not available")
-
-        table_info = data_manager.get_table_info(request.table_name)
-        if not table_info:
-            raise HTTPException(status_code=404, detail="Table not found")
-
-        query = f'SELECT * FROM "{request.table_name}" LIMIT {request.limit}'
-        df = data_manager.execute_query(query)
-        if df is None:
-            raise HTTPException(status_code=500, detail="Failed to query table data")
-        data_result = {"success": True, "data": df.to_dict("records")}
-
-        # 创建可视化
-        viz_result = DataVisualizer.create_chart(
-            data_result["data"],
-            request.chart_type,
-            request.x_column,
-            request.y_column,
-            request.group_by,
-            request.title,
-        )
-
-        if not viz_result["success"]:
-            raise HTTPException(status_code=500, detail=viz_result["error"])
-
-        return VisualizationResponse(success=True, chart_html=viz_result["chart_html"])
+        chart_html = await asyncio.to_thread(_run_visualization, request)
+        return VisualizationResponse(success=True, chart_html=chart_html)
 
     except HTTPException:
         raise
@@ -439,10 +540,10 @@ async def chat_with_data(request: ChatRequest):
         query_request = QueryRequest(
             query=request.message, table_name=table_name, columns=None, limit=None
         )
-        _, agent = _resolve_or_create_agent(query_request)
+        _, agent = await asyncio.to_thread(_resolve_or_create_agent, query_request)
 
         # 执行查询
-        result = agent.query_data(request.message)
+        result = await asyncio.to_thread(agent.query_data, request.message)
 
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -0,0 +1,195 @@
+from functools import cached_property
+from typing import Any, Dict, Literal, Mapping, Optional, Tuple, Type
+import os
+
+from pydantic import BaseModel, PrivateAttr, field_validator, model_validator
+from pydantic.fields import FieldInfo
+from pydantic_settings import (
+    BaseSettings,
+    PydanticBaseSettingsSource,
+    SettingsConfigDict,
+)
+
+from app.config import (
+    DEFAULTS,
+    ENV_FILE,
+    coerce_env_values,
+    collect_env_values,
+    lookup_env,
+    parse_file_size,
+    scan_env_file,
+    sqlite_path,
+)
+
+
+class _EnvMappingSettingsSource(PydanticBaseSettingsSource):
+    """Settings source over a plain mapping, using `lookup_env` name rules."""
+
+    def __init__(self, settings_cls: Type[BaseSettings], source: Mapping[str, str]):
+        super().__init__(settings_cls)
+        self._values = collect_env_values(source, settings_cls.model_fields)
+
+    def get_field_value(
+        self, field: FieldInfo, field_name: str
+    ) -> Tuple[Any, str, bool]:
+        return self._values.get(field_name), field_name, False
+
+    def __call__(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for field_name, field in self.settings_cls.model_fields.items():
+            value, key, _ = self.get_field_value(field, field_name)
+            if value is not None:
+                data[key] = value
+        return data
+
+
+class _EnvFileSettingsSource(_EnvMappingSettingsSource):
+    """Settings source backed by `scan_env_file` instead of python-dotenv."""
+
+    def __init__(self, settings_cls: Type[BaseSettings]):
+        env_file = settings_cls.model_config.get("env_file")
+        # Containers usually export every variable; then the file can't win
+        # over os.environ anyway, so don't touch the disk at all.
+        all_exported = all(
+            lookup_env(os.environ, field_name) is not None
+            for field_name in settings_cls.model_fields
+        )
+        if not env_file or all_exported:
+            scanned: Dict[str, str] = {}
+        else:
+            scanned = scan_env_file(str(env_file))
+        super().__init__(settings_cls, scanned)
+
+
+class Settings(BaseSettings):
+    # API Keys
+    openai_api_key: str = DEFAULTS["openai_api_key"]
+    openai_base_url: str = DEFAULTS["openai_base_url"]
+    anthropic_api_key: str = DEFAULTS["anthropic_api_key"]
+
+    # LangSmith Configuration
+    langchain_tracing_v2: bool = DEFAULTS["langchain_tracing_v2"]
+    langchain_api_key: str = DEFAULTS["langchain_api_key"]
+    langchain_project: str = DEFAULTS["langchain_project"]
+
+    # Database Configuration
+    database_url: str = DEFAULTS["database_url"]
+    metadata_database_url: str = DEFAULTS["metadata_database_url"]
+
+    # FastAPI Configuration
+    host: str = DEFAULTS["host"]
+    port: int = DEFAULTS["port"]
+    debug: bool = DEFAULTS["debug"]
+
+    # File Upload Configuration
+    max_file_size: str = DEFAULTS["max_file_size"]
+    upload_dir: str = DEFAULTS["upload_dir"]
+    _max_file_size_bytes: int = PrivateAttr(default=0)
+
+    # Visualization Configuration
+    vis_output_dir: str = DEFAULTS["vis_output_dir"]
+
+    # Model Configuration
+    performance_model: str = DEFAULTS["performance_model"]
+    reasoning_model: str = DEFAULTS["reasoning_model"]
+    performance_temperature: float = DEFAULTS["performance_temperature"]
+    reasoning_temperature: float = DEFAULTS["reasoning_temperature"]
+    naming_llm_strategy: Literal["always", "lazy", "never"] = DEFAULTS[
+        "naming_llm_strategy"
+    ]
+
+    # MLflow Debug Configuration
+    mlflow_enabled: bool = DEFAULTS["mlflow_enabled"]
+    mlflow_tracking_uri: str = DEFAULTS["mlflow_tracking_uri"]
+    mlflow_experiment_name: str = DEFAULTS["mlflow_experiment_name"]
+    mlflow_run_name_prefix: str = DEFAULTS["mlflow_run_name_prefix"]
+
+    # Frozen: settings are shared process-wide and must never be mutated.
+    model_config = SettingsConfigDict(
+        env_file=ENV_FILE,
+        # Env names are matched exactly by our sources (see lookup_env)
+        case_sensitive=True,
+        extra="ignore",
+        frozen=True,
+    )
+
+    @field_validator(
+        "openai_api_key",
+        "openai_base_url",
+        "anthropic_api_key",
+        "langchain_api_key",
+        mode="before",
+    )
+    @classmethod
+    def _none_to_empty(cls, value: Any) -> Any:
+        # Explicit None (e.g. Settings(openai_api_key=None)) means "unset"
+        return "" if value is None else value
+
+    @model_validator(mode="after")
+    def _parse_max_file_size(self) -> "Settings":
+        self._max_file_size_bytes = parse_file_size(self.max_file_size)
+        return self
+
+    @model_validator(mode="after")
+    def _apply_langsmith(self) -> "Settings":
+        # Configure LangSmith if enabled; tracing without an API key is ignored.
+        # Already-exported values win, so forked workers inherit them untouched.
+        if (
+            self.langchain_tracing_v2
+            and self.langchain_api_key
+            and "LANGCHAIN_TRACING_V2" not in os.environ
+        ):
+            os.environ.setdefault("LANGCHAIN_TRACING_V2", "true")
+            os.environ.setdefault("LANGCHAIN_API_KEY", self.langchain_api_key)
+            os.environ.setdefault("LANGCHAIN_PROJECT", self.langchain_project)
+        return self
+
+    @property
+    def max_file_size_bytes(self) -> int:
+        """`max_file_size` in bytes, parsed once at validation time."""
+        return self._max_file_size_bytes
+
+    # Frozen models still allow cached_property: it writes to __dict__ directly
+    @cached_property
+    def database_path(self) -> Optional[str]:
+        """Filesystem path of `database_url`, or None if it isn't a SQLite file."""
+        return sqlite_path(self.database_url)
+
+    @cached_property
+    def metadata_attach_path(self) -> Optional[str]:
+        """File to `ATTACH ... AS meta` on the business engine, if SQLite."""
+        return sqlite_path(self.metadata_database_url)
+
+    @classmethod
+    def from_environ(cls) -> "Settings":
+        """Build settings from os.environ and `.env` without the sources pipeline.
+
+        `BaseSettings.__init__` always instantiates the default dotenv source
+        (which expands every environment variable) before our customised
+        sources replace it; that is most of its construction time. Here the
+        same precedence (env > `.env` > defaults) is resolved directly and the
+        values go straight to field validation.
+        """
+        values = _EnvFileSettingsSource(cls)()
+        values.update(collect_env_values(os.environ, cls.model_fields))
+        instance = cls.__new__(cls)
+        BaseModel.__init__(instance, **coerce_env_values(values))
+        return instance
+
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: Type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> Tuple[PydanticBaseSettingsSource, ...]:
+        # Same precedence as the default chain; env and .env readers swapped
+        # for ones that understand the NL2SQL_ prefix.
+        return (
+            init_settings,
+            _EnvMappingSettingsSource(settings_cls, os.environ),
+            _EnvFileSettingsSource(settings_cls),
+            file_secret_settings,
+        )
@@ -1,5 +1,6 @@
 import logging
 import os
+import re
 import tempfile
 from io import BytesIO
 from typing import Any, Dict, List, Optional
@@ -11,8 +12,17 @@ from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain_community.utilities import SQLDatabase
 from sqlalchemy import create_engine, text
 
+from app.config import is_debug
+
 logger = logging.getLogger(__name__)
 
+# 工具调用参数里的 SQL 可能混入前端渲染残留的 HTML/Tailwind 标记
+_SQL_MARKUP_RES = (
+    re.compile(r'\d+\s+font-[a-z-]+["\']?>'),
+    re.compile(r"<[^>]+>"),  # 所有 HTML 标签
+    re.compile(r'className="[^"]*"'),
+)
+
 
 class SQLAgentManager:
     """管理LangChain SQL Agent的创建和执行"""
@@ -38,6 +48,8 @@ class SQLAgentManager:
         self.llm = None
         self.agent_executor = None
         self.db_connection = None
+        # 只有自己创建的引擎才在 cleanup 时释放，外部传入的共享引擎不动
+        self.owns_db_connection = False
         self.temp_db_path = None
         self.temperature = temperature
 
@@ -104,6 +116,7 @@ class SQLAgentManager:
             db_uri = f"sqlite:///{self.temp_db_path}"
             engine = create_engine(db_uri)
             self.db_connection = engine
+            self.owns_db_connection = True
 
             # 将数据写入数据库
             df.to_sql(table_name, engine, if_exists="replace", index=False)
@@ -231,9 +244,10 @@ class SQLAgentManager:
 
         except Exception as e:
             logger.error(f"Error creating SQL agent: {str(e)}")
-            import traceback
+            if is_debug():
+                import traceback
 
-            traceback.print_exc()
+                traceback.print_exc()
             return {"success": False, "error": str(e)}
 
     def query_data(self, question: str) -> Dict[str, Any]:
@@ -337,19 +351,9 @@ class SQLAgentManager:
 
                             if sql:
                                 # 清理 SQL 中可能的 HTML/Tailwind 标记
-                                import re
-
                                 sql_clean = sql
-                                # 移除各种可能的 HTML 标记
-                                sql_clean = re.sub(
-                                    r'\d+\s+font-[a-z-]+["\']?>', "", sql_clean
-                                )
-                                sql_clean = re.sub(
-                                    r"<[^>]+>", "", sql_clean
-                                )  # 移除所有 HTML 标签
-                                sql_clean = re.sub(
-                                    r'className="[^"]*"', "", sql_clean
-                                )  # 移除 className
+                                for pattern in _SQL_MARKUP_RES:
+                                    sql_clean = pattern.sub("", sql_clean)
                                 sql_clean = sql_clean.strip()
 
                                 if sql_clean:
@@ -402,9 +406,10 @@ class SQLAgentManager:
 
         except Exception as e:
             logger.error(f"Error querying data: {str(e)}")
-            import traceback
+            if is_debug():
+                import traceback
 
-            traceback.print_exc()
+                traceback.print_exc()
             return {"success": False, "error": str(e)}
 
     def get_table_schema(self) -> Dict[str, Any]:
@@ -477,7 +482,7 @@ class SQLAgentManager:
     def cleanup(self):
         """清理临时文件"""
         try:
-            if self.db_connection:
+            if self.db_connection and self.owns_db_connection:
                 self.db_connection.dispose()
             if self.temp_db_path and os.path.exists(self.temp_db_path):
                 os.unlink(self.temp_db_path)
@@ -4,9 +4,10 @@
 """
 
 import uvicorn
-from app.config import settings
+from app.config import get_settings
 
 if __name__ == "__main__":
+    settings = get_settings()
     print(f"""
     ===================================
     SQL Agent Backend Server
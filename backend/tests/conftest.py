@@ -0,0 +1,26 @@
+import pytest
+
+from app.config import get_settings
+
+
+@pytest.fixture
+def data_manager(tmp_path, monkeypatch):
+    # 相对路径（上传目录、.env 等）都落在 tmp_path 下，不污染工作目录
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    monkeypatch.setenv("MLFLOW_ENABLED", "false")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'sql_agent.db'}")
+    monkeypatch.setenv(
+        "METADATA_DATABASE_URL", f"sqlite:///{tmp_path / 'metadata.db'}"
+    )
+    get_settings.cache_clear()
+
+    from app.data_manager import DataManager
+
+    manager = DataManager(eager=False)
+    # 每个用例都应落在自己的 tmp_path 上，而不是沿用之前构建的配置
+    assert manager.db_url == f"sqlite:///{tmp_path / 'sql_agent.db'}"
+    yield manager
+    if manager.engine is not None:
+        manager.engine.dispose()
+    get_settings.cache_clear()
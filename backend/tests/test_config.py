@@ -0,0 +1,96 @@
+import pytest
+
+from app.config import collect_env_values, get_settings, lookup_env, scan_env_file
+from app.settings_model import Settings
+
+
+@pytest.fixture
+def env_file(tmp_path):
+    def write(content: str) -> str:
+        path = tmp_path / ".env"
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    return write
+
+
+def test_scan_env_file_handles_quotes_export_and_comments(env_file):
+    path = env_file(
+        "# full-line comment\n"
+        "\n"
+        "PLAIN=value\n"
+        "export EXPORTED=yes\n"
+        'DOUBLE="quoted # not a comment"\n'
+        "SINGLE='single quoted'\n"
+        "INLINE=value # trailing comment\n"
+        "HASH=a#b\n"
+        "SPACED = padded \n"
+        "EMPTY=\n"
+        "not a pair\n"
+        "BAD-KEY=ignored\n"
+    )
+
+    assert scan_env_file(path) == {
+        "PLAIN": "value",
+        "EXPORTED": "yes",
+        "DOUBLE": "quoted # not a comment",
+        "SINGLE": "single quoted",
+        "INLINE": "value",
+        "HASH": "a#b",
+        "SPACED": "padded",
+        "EMPTY": "",
+    }
+
+
+def test_scan_env_file_normalises_crlf(env_file):
+    path = env_file("A=1\r\nB='two'\r\nC=3\r")
+
+    assert scan_env_file(path) == {"A": "1", "B": "two", "C": "3"}
+
+
+def test_scan_env_file_missing_file_is_empty(tmp_path):
+    assert scan_env_file(str(tmp_path / "missing.env")) == {}
+
+
+def test_prefixed_name_wins_over_legacy_name():
+    source = {"NL2SQL_PORT": "9000", "PORT": "8000", "HOST": "127.0.0.1"}
+
+    assert lookup_env(source, "port") == "9000"
+    assert lookup_env(source, "host") == "127.0.0.1"
+    assert lookup_env(source, "debug") is None
+    # 变量名须为大写，小写名不生效
+    assert lookup_env({"port": "1"}, "port") is None
+    assert collect_env_values(source, ["port", "host", "debug"]) == {
+        "port": "9000",
+        "host": "127.0.0.1",
+    }
+
+
+def test_settings_precedence_env_over_env_file(env_file, monkeypatch):
+    path = env_file("NL2SQL_PORT=7000\nPORT=7001\nHOST=file-host\nDEBUG=false\n")
+    monkeypatch.setitem(Settings.model_config, "env_file", path)
+    for name in ("PORT", "HOST", "DEBUG"):
+        monkeypatch.delenv(name, raising=False)
+        monkeypatch.delenv(f"NL2SQL_{name}", raising=False)
+    monkeypatch.setenv("HOST", "env-host")
+
+    settings = Settings.from_environ()
+
+    # .env 内部 NL2SQL_ 优先；环境变量整体优先于 .env
+    assert settings.port == 7000
+    assert settings.host == "env-host"
+    assert settings.debug is False
+
+
+def test_get_settings_rebuilds_after_cache_clear(tmp_path, monkeypatch):
+    # get_settings 会创建相对路径下的数据目录
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("NL2SQL_PORT", "1111")
+    get_settings.cache_clear()
+    try:
+        assert get_settings().port == 1111
+        monkeypatch.setenv("NL2SQL_PORT", "2222")
+        get_settings.cache_clear()
+        assert get_settings().port == 2222
+    finally:
+        get_settings.cache_clear()
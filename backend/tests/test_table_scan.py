@@ -0,0 +1,47 @@
+import logging
+import sqlite3
+
+from sqlalchemy import inspect
+
+
+def test_scan_counts_rows_across_several_union_batches(data_manager, tmp_path, caplog):
+    # 表数超过 SQLite 单条复合查询 500 个子句的上限，必须拆成多条 UNION ALL 查询
+    table_count = data_manager.ROW_COUNT_BATCH_SIZE + 150
+    with sqlite3.connect(tmp_path / "sql_agent.db") as conn:
+        for idx in range(table_count):
+            conn.execute(f"CREATE TABLE t{idx} (value INTEGER)")
+            conn.executemany(
+                f"INSERT INTO t{idx} VALUES (?)", [(n,) for n in range(idx % 5)]
+            )
+
+    with caplog.at_level(logging.WARNING, logger="app.data_manager"):
+        tables = {item["table"]: item["rows"] for item in data_manager.get_table_list()}
+
+    assert tables == {f"t{idx}": idx % 5 for idx in range(table_count)}
+    assert "counting per table" not in caplog.text
+
+
+def test_scan_column_names_match_inspector(data_manager, tmp_path, caplog):
+    with sqlite3.connect(tmp_path / "sql_agent.db") as conn:
+        conn.execute(
+            "CREATE TABLE generated ("
+            "a INTEGER, b INTEGER, "
+            "total INTEGER GENERATED ALWAYS AS (a + b) VIRTUAL, "
+            "doubled INTEGER GENERATED ALWAYS AS (a * 2) STORED)"
+        )
+        # fts5 虚表带有隐藏列（表名同名列、rank），不应出现在列名里
+        conn.execute("CREATE VIRTUAL TABLE docs USING fts5(title, body)")
+
+    with caplog.at_level(logging.WARNING, logger="app.data_manager"):
+        with data_manager.engine.connect() as conn:
+            inspector = inspect(conn)
+            table_names = inspector.get_table_names()
+            columns = data_manager._fetch_column_names(conn, inspector, table_names)
+
+    assert columns["generated"] == ["a", "b", "total", "doubled"]
+    assert columns["docs"] == ["title", "body"]
+    assert "using inspector" not in caplog.text
+    fresh = inspect(data_manager.engine)
+    assert columns == {
+        name: [col["name"] for col in fresh.get_columns(name)] for name in table_names
+    }
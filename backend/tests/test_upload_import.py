@@ -0,0 +1,75 @@
+import sqlite3
+from io import BytesIO
+
+import pandas as pd
+
+CSV_WITH_TEMPORAL_TEXT = (
+    b"id,iso,minute,clock,fractional\n"
+    b"1,2024-01-01T10:00:00,2024-01-01 10:00,10:00,2024-01-01 10:00:00.500\n"
+    b"2,2024-02-29T23:59:59,2024-02-29 23:59,23:59,2024-02-29 23:59:59.250\n"
+    b"3,,,,\n"
+)
+
+
+def _table_names(db_path):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        return {row[0] for row in rows}
+
+
+def _metadata_table_names(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT table_name FROM table_metadata")}
+
+
+def test_import_keeps_temporal_text_as_uploaded(data_manager, tmp_path):
+    result = data_manager.import_uploaded_file(
+        CSV_WITH_TEMPORAL_TEXT, "csv", "temporal.csv"
+    )
+    assert result["success"], result.get("error")
+
+    with sqlite3.connect(tmp_path / "sql_agent.db") as conn:
+        stored = conn.execute(
+            f'SELECT * FROM "{result["table_name"]}" ORDER BY 1'
+        ).fetchall()
+
+    # 与默认解析器读出的原文逐格比对，日期/时间列不能被重新格式化
+    baseline = pd.read_csv(BytesIO(CSV_WITH_TEMPORAL_TEXT))
+    expected = [
+        tuple(None if pd.isna(v) else v for v in row)
+        for row in baseline.astype(object).itertuples(index=False, name=None)
+    ]
+    assert stored == expected
+
+
+def test_import_rolls_back_table_when_metadata_save_fails(
+    data_manager, tmp_path, monkeypatch
+):
+    def fail_save(*args, **kwargs):
+        raise RuntimeError("metadata write failed")
+
+    # to_sql 已在事务内建表写数据，随后写元信息失败
+    monkeypatch.setattr(data_manager, "_save_table_metadata", fail_save)
+    result = data_manager.import_uploaded_file(b"a,b\n1,2\n", "csv", "rollback.csv")
+
+    assert not result["success"]
+    assert _table_names(tmp_path / "sql_agent.db") == set()
+    assert _metadata_table_names(tmp_path / "metadata.db") == set()
+    assert data_manager.get_table_list() == []
+
+
+def test_import_rolls_back_partial_metadata_write(data_manager, tmp_path, monkeypatch):
+    write_table_metadata = data_manager._write_table_metadata
+
+    def write_then_fail(*args, **kwargs):
+        write_table_metadata(*args, **kwargs)
+        raise RuntimeError("failed after writing metadata rows")
+
+    # 元信息行已写入同一事务，之后失败也要连同业务表一起回滚
+    monkeypatch.setattr(data_manager, "_write_table_metadata", write_then_fail)
+    result = data_manager.import_uploaded_file(b"a,b\n1,2\n", "csv", "rollback.csv")
+
+    assert not result["success"]
+    assert _table_names(tmp_path / "sql_agent.db") == set()
+    assert _metadata_table_names(tmp_path / "metadata.db") == set()
+    assert data_manager.get_table_list() == []
@@ -1,15 +1,67 @@
+import importlib.util
 import io
 import logging
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Callable, Dict, List, Optional, cast
 
 import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# python-calamine 为可选依赖：安装后用 Rust 实现的 calamine 解析 Excel，远快于 openpyxl；
+# 未安装时交给 pandas 按扩展名选默认引擎
+_EXCEL_ENGINE: Optional[str] = (
+    "calamine" if importlib.util.find_spec("python_calamine") is not None else None
+)
+
+
+def read_excel_bytes(file_content: bytes, **kwargs: Any) -> pd.DataFrame:
+    """从字节内容读取 Excel 的第一个工作表，其余参数透传给 pd.read_excel"""
+    return pd.read_excel(io.BytesIO(file_content), engine=_EXCEL_ENGINE, **kwargs)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _float_or_none(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+# 常见标量按确切类型一次查表转换，不再逐个 isinstance/issubdtype 判断；
+# 结果与下面的通用分支一致（np.float64 是 float 子类，NaN 同样转成 None）
+_SCALAR_CONVERTERS: Dict[type, Callable[[Any], Any]] = {
+    type(None): _identity,
+    str: _identity,
+    int: _identity,
+    bool: _identity,
+    float: lambda v: None if np.isnan(v) else v,
+    np.float64: _float_or_none,
+    np.float32: lambda v: float(v.item()),
+    np.float16: lambda v: float(v.item()),
+    np.bool_: lambda v: bool(v.item()),
+    np.datetime64: str,
+    **{
+        t: lambda v: int(v.item())
+        for t in (
+            np.int8,
+            np.int16,
+            np.int32,
+            np.int64,
+            np.uint8,
+            np.uint16,
+            np.uint32,
+            np.uint64,
+        )
+    },
+}
+
 
 def convert_numpy_to_native(value: Any) -> Any:
     """将 NumPy 类型转换为 Python 原生类型"""
+    converter = _SCALAR_CONVERTERS.get(type(value))
+    if converter is not None:
+        return converter(value)
     if value is None or (isinstance(value, float) and np.isnan(value)):
         return None
     if isinstance(value, np.generic):
@@ -27,6 +79,18 @@ def convert_numpy_to_native(value: Any) -> Any:
     return value
 
 
+def _numeric_summary(values: np.ndarray) -> Dict[str, Any]:
+    """在已剔除缺失值的 ndarray 上一次性计算 min/max/mean/median"""
+    if values.size == 0:
+        return {"min": None, "max": None, "mean": None, "median": None}
+    return {
+        "min": convert_numpy_to_native(values.min()),
+        "max": convert_numpy_to_native(values.max()),
+        "mean": float(values.mean()),
+        "median": float(np.median(values)),
+    }
+
+
 class FileProcessor:
     """处理CSV和Excel文件的读取和表头解析"""
 
@@ -43,24 +107,17 @@ class FileProcessor:
             包含表头信息的字典
         """
         try:
+            # 只解析一次前 100 行：表头取自同一个 DataFrame，不再单独读一遍 nrows=0
             if file_type == "csv":
-                # 只读取前几行获取表头
-                df = pd.read_csv(io.BytesIO(file_content), nrows=0)
+                sample_df = pd.read_csv(io.BytesIO(file_content), nrows=100)
             elif file_type in ["excel", "xlsx", "xls"]:
                 # 读取Excel文件的第一个工作表
-                df = pd.read_excel(io.BytesIO(file_content), nrows=0)
+                sample_df = read_excel_bytes(file_content, nrows=100)
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
 
             # 获取列名和基本信息
-            headers = df.columns.tolist()
-
-            # 推断每列的数据类型
-            sample_df = (
-                pd.read_csv(io.BytesIO(file_content), nrows=100)
-                if file_type == "csv"
-                else pd.read_excel(io.BytesIO(file_content), nrows=100)
-            )
+            headers = sample_df.columns.tolist()
 
             column_info = []
             for col in headers:
@@ -94,22 +151,16 @@ class FileProcessor:
     @staticmethod
     def _estimate_rows(file_content: bytes, file_type: str) -> int:
         """估算文件的行数"""
-        try:
-            if file_type == "csv":
-                # 读取几行来估算平均行大小
-                text = file_content.decode("utf-8", errors="ignore")
-                lines = text.split("\n")[:10]  # 取前10行
-                if lines:
-                    avg_line_length = sum(len(line) for line in lines) / len(lines)
-                    total_size = len(text)
-                    estimated_rows = int(total_size / avg_line_length)
-                    return min(estimated_rows, 1000000)  # 限制最大估算值
-            elif file_type in ["excel", "xlsx", "xls"]:
-                # Excel文件需要使用openpyxl或xlrd
-                return 1000  # 保守估计
-            return 1000
-        except:
-            return 1000
+        if not file_content:
+            return 0
+        if file_type == "csv":
+            # 直接在字节上数换行符，不再整份解码并切分成行列表
+            estimated_rows = file_content.count(b"\n")
+            if not file_content.endswith(b"\n"):
+                estimated_rows += 1
+            return min(estimated_rows, 1000000)  # 限制最大估算值
+        # Excel 需要完整解析工作表才能得到行数，这里给保守估计；上传接口以导入结果为准
+        return 1000
 
     @staticmethod
     def query_data(
@@ -133,11 +184,20 @@ class FileProcessor:
             查询结果
         """
         try:
-            # 读取文件
+            # 只解析需要返回的前 limit 行；总行数只在确实超过 limit 时
+            # 再按首列单独统计，不必把整份文件的所有列都转换出来
             if file_type == "csv":
-                df = pd.read_csv(io.BytesIO(file_content))
+                df = pd.read_csv(io.BytesIO(file_content), nrows=limit)
+                total_rows = len(df)
+                if total_rows >= limit:
+                    total_rows = len(
+                        pd.read_csv(io.BytesIO(file_content), usecols=[0])
+                    )
             elif file_type in ["excel", "xlsx", "xls"]:
-                df = pd.read_excel(io.BytesIO(file_content))
+                df = read_excel_bytes(file_content, nrows=limit)
+                total_rows = len(df)
+                if total_rows >= limit:
+                    total_rows = len(read_excel_bytes(file_content, usecols=[0]))
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
 
@@ -159,22 +219,18 @@ class FileProcessor:
             # 应用限制
             result_df = df.head(limit)
 
-            # 转换为字典列表，并处理 NumPy 类型
+            # 整列转换为 Python 原生对象并把缺失值换成 None，不再逐个单元格转换
+            native_df = result_df.astype(object).where(result_df.notna(), None)
+            keys = [str(col) for col in result_df.columns]
             data: List[Dict[str, Any]] = [
-                {str(col): val for col, val in zip(result_df.columns, row)}
-                for row in result_df.itertuples(index=False, name=None)
+                dict(zip(keys, row))
+                for row in native_df.itertuples(index=False, name=None)
             ]
 
-            # 递归转换所有 NumPy 类型
-            def clean_dict(d: Dict[str, Any]) -> Dict[str, Any]:
-                return {k: convert_numpy_to_native(v) for k, v in d.items()}
-
-            data = [clean_dict(row) for row in data]
-
             return {
                 "success": True,
                 "data": data,
-                "total_rows": len(df),
+                "total_rows": total_rows,
                 "returned_rows": len(data),
                 "columns": df.columns.tolist(),
             }
@@ -200,7 +256,7 @@ class FileProcessor:
             if file_type == "csv":
                 df = pd.read_csv(io.BytesIO(file_content), nrows=1000)
             elif file_type in ["excel", "xlsx", "xls"]:
-                df = pd.read_excel(io.BytesIO(file_content), nrows=1000)
+                df = read_excel_bytes(file_content, nrows=1000)
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
 
@@ -221,35 +277,24 @@ class FileProcessor:
                     "null_count": int(cast(int, series.isnull().sum())),
                     "unique_count": int(cast(int, series.nunique())),
                 }
-                # 将 null_count 和 unique_count 转换为 Python 原生类型
-                col_summary["null_count"] = convert_numpy_to_native(
-                    col_summary["null_count"]
-                )
-                col_summary["unique_count"] = convert_numpy_to_native(
-                    col_summary["unique_count"]
-                )
-
+                # 按 dtype.kind 分派：int32/float32、可空 Int64 与 Arrow 类型同样适用
+                kind = series.dtype.kind
                 # 数值型列的额外统计
-                if series.dtype in ["int64", "float64"]:
+                if kind in "iuf":
+                    col_summary.update(_numeric_summary(series.dropna().to_numpy()))
+
+                # 日期型列只给出范围
+                elif kind == "M":
+                    non_null = series.dropna()
                     col_summary.update(
                         {
-                            "min": convert_numpy_to_native(series.min())
-                            if not series.empty
-                            else None,
-                            "max": convert_numpy_to_native(series.max())
-                            if not series.empty
-                            else None,
-                            "mean": convert_numpy_to_native(series.mean())
-                            if not series.empty
-                            else None,
-                            "median": convert_numpy_to_native(series.median())
-                            if not series.empty
-                            else None,
+                            "min": str(non_null.min()) if not non_null.empty else None,
+                            "max": str(non_null.max()) if not non_null.empty else None,
                         }
                     )
 
                 # 字符串型列的额外统计
-                elif series.dtype == "object":
+                elif kind == "O":
                     value_counts = series.value_counts().head(5)
                     # 转换 value_counts 中的 NumPy 类型
                     most_common = {